@@ -1,5 +1,29 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
+from scipy.sparse import csr_matrix
+
+
+class cached_property(object):
+    r"""
+    Decorator that turns a method into an attribute computed the first time it is accessed. The result
+    is stored in the instance dictionary, so later accesses are ordinary attribute lookups.
+
+    """
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        value = instance.__dict__[self.func.__name__] = self.func(instance)
+
+        return value
 
 
 def build_des_mat(*args, group=None):
@@ -24,3 +48,566 @@ def build_des_mat(*args, group=None):
         c = c.values
 
     return c
+
+
+class Design(object):
+    r"""
+    Compact representation of a grouped design: integer group codes, a table of the group labels and
+    a contiguous floating point block of the response values.
+
+    Parameters
+    ----------
+    codes : array-like
+        Integer group code of each observation, indexing into :code:`labels`.
+    labels : array-like
+        The distinct group labels, in sorted order.
+    values : array-like
+        Two-dimensional array of the response values with one row per observation.
+
+    Attributes
+    ----------
+    codes : numpy ndarray
+        Integer group code of each observation.
+    labels : numpy ndarray
+        The distinct group labels.
+    values : numpy ndarray
+        The response values, one row per observation and one column per response variable.
+    n : int
+        The number of observations.
+    k : int
+        The number of groups.
+    counts : numpy ndarray
+        The number of observations in each group.
+
+    """
+    def __init__(self, codes, labels, values):
+        self.codes = np.asarray(codes, dtype=np.intp)
+        self.labels = np.asarray(labels)
+        self.values = values
+        self.n = self.codes.shape[0]
+        self.k = self.labels.shape[0]
+        self.counts = np.bincount(self.codes, minlength=self.k)
+        self._order = None
+        self._indicator = None
+
+    def split(self, values=None):
+        r"""
+        Splits the values into one array per group, in the order of :code:`labels`.
+
+        Parameters
+        ----------
+        values : array-like, optional
+            Array with one row per observation. Defaults to the response values.
+
+        Returns
+        -------
+        list
+            List of the arrays of each group's values.
+
+        """
+        if values is None:
+            values = self.values
+
+        if self._order is None:
+            self._order = np.argsort(self.codes, kind='stable')
+
+        return np.split(np.asarray(values)[self._order], np.cumsum(self.counts)[:-1])
+
+    def group_by(self, values, func):
+        r"""
+        Applies a function to each group's values.
+
+        Parameters
+        ----------
+        values : array-like
+            Array with one row per observation.
+        func : callable
+            Function applied to the values of each group.
+
+        Returns
+        -------
+        list
+            List of :code:`(label, result)` tuples, in the order of :code:`labels`.
+
+        """
+        return [(label, func(v)) for label, v in zip(self.labels, self.split(values))]
+
+    def group_sums(self, values=None):
+        r"""
+        Computes the sum of the values of each group in a single vectorized pass.
+
+        Parameters
+        ----------
+        values : array-like, optional
+            One or two-dimensional array with one row per observation. Defaults to the response values.
+
+        Returns
+        -------
+        numpy ndarray
+            The sums of each group, with one row per group for two-dimensional values. The sums are always
+            accumulated in float64.
+
+        """
+        if values is None:
+            values = self.values
+
+        values = np.asarray(values)
+
+        if values.ndim == 1:
+            return np.bincount(self.codes, weights=values, minlength=self.k)
+
+        if values.dtype != np.float64:
+            # Summing column by column only converts one column at a time to float64.
+            return np.column_stack([np.bincount(self.codes, weights=values[:, j], minlength=self.k)
+                                    for j in range(values.shape[1])])
+
+        if self._indicator is None:
+            self._indicator = csr_matrix((np.ones(self.n), (self.codes, np.arange(self.n))), shape=(self.k, self.n))
+
+        return np.asarray(self._indicator.dot(values))
+
+    def group_moments(self, values=None):
+        r"""
+        Computes the number of observations, mean and variance of each group.
+
+        Parameters
+        ----------
+        values : array-like, optional
+            One or two-dimensional array with one row per observation. Defaults to the response values.
+
+        Returns
+        -------
+        counts, means, variances : numpy ndarray
+            The number of observations, means and sample variances of each group. Means and variances
+            have one row per group for two-dimensional values.
+
+        Notes
+        -----
+        The group sums are found with one grouped pass over the data, and the sums of squared deviations
+        with a second pass over the values centered by their group means, which avoids the cancellation
+        of the textbook one pass formula.
+
+        """
+        if values is None:
+            values = self.values
+
+        values = np.asarray(values)
+        counts = self.counts if values.ndim == 1 else self.counts[:, np.newaxis]
+
+        means = self.group_sums(values) / counts
+        ss = self.group_sums((values - means.astype(values.dtype)[self.codes]) ** 2)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variances = ss / (counts - 1)
+
+        return self.counts, means, variances
+
+    def group_vector(self):
+        r"""
+        Returns the group label of each observation.
+
+        Returns
+        -------
+        numpy ndarray
+            The group label of each observation.
+
+        """
+        return self.labels[self.codes]
+
+    def to_matrix(self):
+        r"""
+        Returns the design as a single matrix with the group labels in the first column and the
+        response values in the remaining columns, as returned by :code:`build_des_mat`.
+
+        Returns
+        -------
+        numpy ndarray
+            The design matrix.
+
+        """
+        c = pd.DataFrame(self.values)
+        c.insert(0, 'group', self.group_vector())
+
+        return c.values
+
+
+def build_design(*args, group=None, dtype=np.float64):
+    r"""
+    Builds a compact :code:`Design` from sample observation vectors and an optional group vector.
+
+    Parameters
+    ----------
+    group_sample1, group_sample2, ... : array-like
+        Observation vectors. If :code:`group` is given, each vector is a response variable with one
+        value per observation (two-dimensional arrays give one response variable per column).
+        Otherwise each vector is the sample of one group and the samples may have different lengths.
+    group : array-like, optional
+        One-dimensional array of the group membership of each observation.
+    dtype : numpy dtype, optional
+        Floating point dtype of the response values. Defaults to float64.
+
+    Returns
+    -------
+    Design
+        The design with the group codes found by a single factorization of the group vector.
+
+    Raises
+    ------
+    ValueError
+        If :code:`dtype` is not a floating point dtype.
+
+    """
+    if not np.issubdtype(np.dtype(dtype), np.floating):
+        raise ValueError('dtype must be a floating point dtype.')
+
+    arg_list = []
+
+    for arg in args:
+        if isinstance(arg, (pd.DataFrame, pd.Series)):
+            arg = arg.squeeze()
+
+        arg_list.append(np.asarray(arg, dtype=dtype))
+
+    if group is None:
+        arg_list = [arg.ravel() for arg in arg_list]
+
+        codes = np.repeat(np.arange(len(arg_list)), [len(arg) for arg in arg_list])
+        labels = np.arange(len(arg_list))
+        values = np.concatenate(arg_list)[:, np.newaxis]
+
+    else:
+        if isinstance(group, (pd.DataFrame, pd.Series)):
+            group = group.squeeze()
+
+        codes, labels = pd.factorize(np.asarray(group), sort=True)
+        values = np.column_stack(arg_list)
+
+    return Design(codes, np.asarray(labels), np.ascontiguousarray(values, dtype=dtype))
+
+
+def scatter_matrix(values, centers, codes=None, chunksize=65536):
+    r"""
+    Computes the matrix of sums of squares and cross products of the values about their centers,
+    accumulated in float64 over blocks of rows.
+
+    Parameters
+    ----------
+    values : array-like
+        Two-dimensional array with one row per observation, of any floating point dtype.
+    centers : array-like
+        The center of every observation, or with :code:`codes`, the center of each group.
+    codes : array-like, optional
+        The group code of each observation, indexing into the rows of :code:`centers`.
+    chunksize : int, optional
+        Number of rows converted to float64 at a time. Defaults to 65536.
+
+    Returns
+    -------
+    numpy ndarray
+        The :math:`p \times p` scatter matrix in float64.
+
+    """
+    p = values.shape[1]
+    scatter = np.zeros((p, p))
+
+    for start in range(0, values.shape[0], chunksize):
+        block = values[start:start + chunksize].astype(np.float64)
+
+        if codes is None:
+            block -= centers
+        else:
+            block -= centers[codes[start:start + chunksize]]
+
+        scatter += np.dot(block.T, block)
+
+    return scatter
+
+
+def permutation_test(design, values, statistic, n_permutations=9999, batch_size=None, n_jobs=1,
+                     random_state=None):
+    r"""
+    Performs a permutation test of a statistic that depends on the data only through the group sums.
+
+    Parameters
+    ----------
+    design : Design
+        The design giving the group code of each observation.
+    values : array-like
+        One-dimensional array of the values summed within each group.
+    statistic : callable
+        Function mapping a :math:`B \times k` array of group sums to the :math:`B` statistics.
+    n_permutations : int, optional
+        Number of random permutations of the group labels. Defaults to 9999.
+    batch_size : int, optional
+        Number of permutations evaluated at once. Defaults to the number that keeps the working memory of
+        a batch near 32 MB.
+    n_jobs : int, optional
+        Number of processes computing batches concurrently. -1 uses all available processors. Defaults to 1.
+    random_state : int, optional
+        Seed of the random permutations. For a given seed and :code:`batch_size` the result is the same for
+        any :code:`n_jobs`.
+
+    Returns
+    -------
+    observed, p_value : float
+        The statistic of the observed grouping and the permutation p-value.
+
+    Notes
+    -----
+    Each batch draws a :math:`B \times n` matrix of permuted group codes and finds the :math:`B \times k`
+    group sums with a single :code:`bincount` over the codes offset by :math:`k` times the row number. The
+    p-value counts the observed grouping as one of the permutations,
+
+    .. math::
+
+        p = \frac{1 + \#\{b : T_b \geq T_{obs}\}}{1 + B}
+
+    so that it is never zero.
+
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = design.n
+
+    if batch_size is None:
+        batch_size = max(1, 2 ** 20 // n)
+
+    observed = statistic(design.group_sums(values)[np.newaxis, :])[0]
+    tolerance = 1e-10 * max(abs(observed), 1.)
+
+    exceed = 0
+
+    for sums in _permutation_group_sums(design.codes, values, design.k, n_permutations, batch_size, n_jobs,
+                                        random_state):
+        exceed += np.sum(statistic(sums) >= observed - tolerance)
+
+    p_value = (exceed + 1.) / (n_permutations + 1.)
+
+    return observed, p_value
+
+
+class QuantileSketch(object):
+    r"""
+    Mergeable KLL quantile sketch of a stream of observations that keeps a bounded number of weighted
+    items in place of the full sample.
+
+    Parameters
+    ----------
+    k : int, optional
+        Capacity of the largest compactor. The number of retained items is about :math:`3k` and the rank
+        error falls as :math:`1 / k`. Defaults to 200.
+    random_state : int or numpy RandomState, optional
+        Seed of the random offsets of the compactions.
+
+    Attributes
+    ----------
+    n : int
+        The number of observations summarized.
+    max_rank_error : float
+        Guaranteed upper bound on the absolute error of any rank computed from the sketch.
+
+    Notes
+    -----
+    Items at level :math:`h` stand for :math:`2^h` observations. When a level holds more items than its
+    capacity :math:`\max(2, \lceil k (2/3)^{H - 1 - h} \rceil)`, where :math:`H` is the number of levels,
+    and the sketch holds more items than the sum of the capacities, the lowest such level is sorted and
+    every other item, starting at a random offset, is promoted to level :math:`h + 1`.
+    Such a compaction moves the rank of any value by at most :math:`2^h`, so the sum of :math:`2^h` over
+    all compactions, kept as :code:`max_rank_error`, bounds the rank error deterministically. It is
+    typically much smaller than the bound, about :math:`1.7n / k` at 99% confidence.
+
+    References
+    ----------
+    Karnin, Z., Lang, K., & Liberty, E. (2016). Optimal Quantile Approximation in Streams.
+        2016 IEEE 57th Annual Symposium on Foundations of Computer Science, 71-78.
+        https://doi.org/10.1109/FOCS.2016.17
+
+    """
+    def __init__(self, k=200, random_state=None):
+        if k < 2:
+            raise ValueError('k must be at least 2.')
+
+        self.k = k
+        self.n = 0
+        self.max_rank_error = 0.
+        self.levels = [np.zeros(0)]
+
+        if isinstance(random_state, np.random.RandomState):
+            self._random_state = random_state
+        else:
+            self._random_state = np.random.RandomState(random_state)
+
+    def update(self, y):
+        r"""
+        Adds a chunk of observations to the sketch.
+
+        Parameters
+        ----------
+        y : array-like
+            Array of the observations, flattened to one dimension.
+
+        Notes
+        -----
+        The observations are added to the lowest level with weight one and the levels are compacted
+        until the sketch is within its capacity. The work is dominated by sorting the chunk, so adding
+        observations in large chunks is much faster than one at a time.
+
+        """
+        y = np.asarray(y, dtype=np.float64).ravel()
+
+        self.levels[0] = np.concatenate([self.levels[0], y])
+        self.n += y.shape[0]
+
+        self._compress()
+
+    def merge(self, other):
+        r"""
+        Merges another :code:`QuantileSketch` into this one.
+
+        Parameters
+        ----------
+        other : QuantileSketch
+            The sketch to merge. It is not modified.
+
+        Returns
+        -------
+        QuantileSketch
+            The merged sketch, :code:`self`.
+
+        Notes
+        -----
+        The items of each level of :code:`other` are appended to the same level of this sketch, which is
+        then compacted with its own capacity :code:`k` and random offsets until it is within its capacity.
+        The merged sketch summarizes all the observations of both. Its :code:`max_rank_error` is the sum of
+        the bounds of the two sketches plus :math:`2^h` for each compaction at level :math:`h` made in the
+        merge, so it remains a guaranteed bound on the rank error.
+
+        """
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.zeros(0))
+
+            self.levels[h] = np.concatenate([self.levels[h], items])
+
+        self.n += other.n
+        self.max_rank_error += other.max_rank_error
+
+        self._compress()
+
+        return self
+
+    def weighted_values(self):
+        r"""
+        Returns the retained items in sorted order with the number of observations each stands for.
+
+        Returns
+        -------
+        tuple
+            The sorted values and their weights, which sum to :code:`n`.
+
+        """
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(items.shape[0], 2. ** h) for h, items in enumerate(self.levels)])
+
+        order = np.argsort(values, kind='mergesort')
+
+        return values[order], weights[order]
+
+    def _capacity(self, h):
+        return max(2, int(np.ceil(self.k * (2. / 3.) ** (len(self.levels) - 1 - h))))
+
+    def _compress(self):
+        while sum(items.shape[0] for items in self.levels) > sum(self._capacity(h) for h in
+                                                                  range(len(self.levels))):
+            h = next(h for h, items in enumerate(self.levels) if items.shape[0] > self._capacity(h))
+
+            if h + 1 == len(self.levels):
+                self.levels.append(np.zeros(0))
+
+            items = np.sort(self.levels[h])
+
+            # An odd item out stays at its level so that weight is conserved.
+            keep = items.shape[0] % 2
+            offset = self._random_state.randint(2)
+
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[keep + offset::2]])
+            self.levels[h] = items[:keep]
+
+            self.max_rank_error += 2. ** h
+
+
+def _bounded_map(fn, tasks, n_jobs=1, max_pending=None, executor=ProcessPoolExecutor):
+    r"""
+    Lazily applies a function to each tuple of arguments, in parallel if :code:`n_jobs` is above one.
+
+    Parameters
+    ----------
+    fn : callable
+        The function to apply. Must be picklable if :code:`executor` runs it in other processes.
+    tasks : iterable
+        Iterable of tuples of the positional arguments of each call.
+    n_jobs : int, optional
+        Number of workers. -1 uses all the processors. If None or 1 (default), the calls are made in
+        the calling thread.
+    max_pending : int, optional
+        Largest number of calls submitted but not yet yielded. Defaults to twice :code:`n_jobs`.
+    executor : type, optional
+        The :code:`concurrent.futures` executor class. Defaults to :code:`ProcessPoolExecutor`.
+
+    Returns
+    -------
+    generator
+        The results of the calls, in the order of :code:`tasks`.
+
+    Notes
+    -----
+    Only a bounded number of calls are in flight at once, so results that have not been consumed do not
+    pile up in memory.
+
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+
+    if n_jobs is None or n_jobs <= 1:
+        for args in tasks:
+            yield fn(*args)
+
+        return
+
+    if max_pending is None:
+        max_pending = 2 * n_jobs
+
+    with executor(max_workers=n_jobs) as pool:
+        pending = deque()
+
+        for args in tasks:
+            pending.append(pool.submit(fn, *args))
+
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def _permutation_group_sums(codes, values, k, n_permutations, batch_size, n_jobs, random_state):
+    sizes = [batch_size] * (n_permutations // batch_size)
+
+    if n_permutations % batch_size:
+        sizes.append(n_permutations % batch_size)
+
+    seeds = np.random.RandomState(random_state).randint(0, 2 ** 31 - 1, size=len(sizes))
+
+    tasks = ((codes, values, k, size, seed) for size, seed in zip(sizes, seeds))
+
+    return _bounded_map(_permuted_group_sums, tasks, n_jobs)
+
+
+def _permuted_group_sums(codes, values, k, size, seed):
+    rng = np.random.RandomState(seed)
+
+    permuted = codes[np.argsort(rng.random_sample((size, codes.shape[0])), axis=1)]
+    permuted += k * np.arange(size)[:, np.newaxis]
+
+    sums = np.bincount(permuted.ravel(), weights=np.tile(values, size), minlength=size * k)
+
+    return sums.reshape(size, k)
@@ -10,7 +10,20 @@ One-Way Analysis of Variance
     :toctree: generated/
 
     AnovaOneWay
+    AnovaOneWayBatch
+    GroupMoments
     ManovaOneWay
+    ManovaOneWayBatch
+
+Notes
+-----
+The analyses accept a :code:`dtype` argument that sets the floating point dtype in which the responses
+are stored. With :code:`np.float32` the responses take half the memory, while the group sums, sums of
+squares and cross product matrices are accumulated in float64. Precision is then only lost where the
+responses and their deviations from the group means are rounded to float32, a relative error of about
+:math:`6 \times 10^{-8}` per value, and the statistics typically agree with those computed in float64 to
+a relative tolerance of :math:`10^{-5}`. Data whose groups differ by far less than their means, or nearly
+singular error matrices in MANOVA, amplify this error and should be analyzed in float64.
 
 References
 ----------
@@ -28,11 +41,11 @@ Rencher, A. (n.d.). Methods of Multivariate Analysis (2nd ed.).
 
 
 import numpy as np
-import numpy_indexed as npi
+import pandas as pd
+from scipy.linalg import eigh
 from scipy.stats import f
 
-from hypothetical._lib import build_des_mat
-from hypothetical.summary import var
+from hypothetical._lib import Design, build_design, cached_property, permutation_test, scatter_matrix
 
 
 class AnovaOneWay(object):
@@ -49,11 +62,17 @@ class AnovaOneWay(object):
         Corresponding observation vectors of the group samples. Must be the same length
         as the group parameter. If the group parameter is None, each observation vector
         will be treated as a group sample vector.
+    dtype : numpy dtype, optional
+        Floating point dtype in which the responses are stored. :code:`np.float32` halves their memory,
+        while sums and cross products are still accumulated in float64. Defaults to float64.
 
     Attributes
     ----------
+    design : Design
+        Compact representation of the data with integer group codes, the table of group labels and
+        the response values.
     design_matrix : array-like
-        Numpy ndarray representing the data matrix for the analysis.
+        Numpy ndarray representing the data matrix for the analysis. Built from :code:`design` when accessed.
     group_names: array-like
         Numpy array of the group names.
     k : int
@@ -76,6 +95,20 @@ class AnovaOneWay(object):
         The p-value from the :math:`F` distribution given the calculated :math:`F` statistic.
     analysis_type : str
         Name of the analysis performed, currently only reutns 'One-Way ANOVA'
+    group_stats : dict
+        Dictionary of the means, number of observations and variance of each group.
+    test_summary : dict
+        Dictionary summarizing the analysis.
+    welch_statistic : dict
+        Dictionary containing Welch's :math:`F` statistic for groups with unequal variances, and its degrees
+        of freedom and p-value.
+    brown_forsythe_statistic : dict
+        Dictionary containing the Brown-Forsythe :math:`F^*` statistic for groups with unequal variances, and
+        its degrees of freedom and p-value.
+
+    The :code:`p_value`, :code:`group_stats`, :code:`test_summary`, :code:`welch_statistic` and
+    :code:`brown_forsythe_statistic` attributes are computed when they are first accessed and then cached.
+    All of them are found from the same group counts, means and variances.
 
     Notes
     -----
@@ -197,20 +230,112 @@ class AnovaOneWay(object):
         Brigham Young University: John Wiley & Sons, Inc.
 
     """
-    def __init__(self, *args, group=None):
+    def __init__(self, *args, group=None, dtype=np.float64):
 
-        self.design_matrix = build_des_mat(*args, group=group)
+        self.design = build_design(*args, group=group, dtype=dtype)
 
         if group is not None:
             self.group = group
         else:
-            self.group = self.design_matrix[:, 0]
+            self.group = self.design.group_vector()
 
-        self.group_stats = self._group_statistics()
-        self.group_names = np.unique(self.group)
-        self.k = len(self.group_names)
+        counts, means, variances = self.design.group_moments(self.design.values[:, 0])
+
+        self._fit(self.design.labels, counts, means, variances)
+
+    @classmethod
+    def from_summary(cls, counts, means=None, variances=None, sums=None, sum_squares=None, labels=None):
+        r"""
+        Performs one-way ANOVA from the summary statistics of each group rather than the raw observations.
+
+        Parameters
+        ----------
+        counts : array-like
+            The number of observations in each group.
+        means, variances : array-like, optional
+            The mean and sample variance of each group.
+        sums, sum_squares : array-like, optional
+            The sum and the sum of squares of the observations in each group. Used when :code:`means` and
+            :code:`variances` are not given.
+        labels : array-like, optional
+            The name of each group. Defaults to the group position, starting from 0.
+
+        Returns
+        -------
+        AnovaOneWay
+            The fitted analysis. The :code:`design`, :code:`design_matrix` and :code:`group` attributes are
+            :code:`None` as the observations are not available.
+
+        Raises
+        ------
+        ValueError
+            If neither the means and variances nor the sums and sums of squares are given, or the summaries
+            do not all have one entry per group.
+
+        Notes
+        -----
+        The sums of squares of the analysis only depend on the number of observations, mean and variance of
+        each group, so the results are the same as those found from the raw observations. When the sums and
+        sums of squares are given, the group variances are found with the textbook one pass formula
+
+        .. math::
+
+            s_i^2 = \frac{\sum y_{ij}^2 - (\sum y_{ij})^2 / n_i}{n_i - 1}
+
+        which may lose precision when the group means are large relative to their standard deviations. The
+        means and variances, such as those accumulated by :code:`GroupMoments`, should be preferred.
+
+        Examples
+        --------
+        >>> aov = AnovaOneWay.from_summary([3, 3, 3],
+        ...                                means=[4.976667, 4.463333, 5.323333],
+        ...                                variances=[0.528033, 0.104533, 0.044233],
+        ...                                labels=['ctrl', 'trt1', 'trt2'])
+        >>> aov.f_statistic
+        2.4895628...
+
+        """
+        counts = np.asarray(counts)
+
+        if means is not None and variances is not None:
+            means = np.asarray(means, dtype=np.float64)
+            variances = np.asarray(variances, dtype=np.float64)
+
+        elif sums is not None and sum_squares is not None:
+            sums = np.asarray(sums, dtype=np.float64)
+            sum_squares = np.asarray(sum_squares, dtype=np.float64)
+
+            means = sums / counts
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                variances = (sum_squares - sums * means) / (counts - 1)
+
+        else:
+            raise ValueError('either means and variances or sums and sum_squares must be given.')
+
+        if labels is None:
+            labels = np.arange(counts.shape[0])
+
+        labels = np.asarray(labels)
+
+        if not counts.ndim == means.ndim == variances.ndim == labels.ndim == 1 or \
+                not counts.shape == means.shape == variances.shape == labels.shape:
+            raise ValueError('the group summaries must be one-dimensional with one entry per group.')
+
+        aov = cls.__new__(cls)
+        aov.design = None
+        aov.group = None
+        aov._fit(labels, counts, means, variances)
+
+        return aov
+
+    def _fit(self, labels, counts, means, variances):
+        self._group_counts, self._group_means, self._group_variances = counts, means, variances
+
+        self.group_names = labels
+        self.k = labels.shape[0]
         self.group_degrees_of_freedom = self.k - 1
-        self.residual_degrees_of_freedom = len(self.design_matrix) - self.k
+        self.residual_degrees_of_freedom = int(np.sum(counts)) - self.k
 
         self.group_sum_squares = self._sst()
         self.residual_sum_squares = self._sse()
@@ -219,9 +344,108 @@ class AnovaOneWay(object):
         self.residual_mean_squares = self._mse()
 
         self.f_statistic = self._fvalue()
-        self.p_value = self._pvalue()
         self.analysis_type = 'One-Way ANOVA'
-        self.test_summary = self._generate_result_summary()
+
+    @property
+    def design_matrix(self):
+        if self.design is None:
+            return None
+
+        return self.design.to_matrix()
+
+    @cached_property
+    def group_stats(self):
+        return self._group_statistics()
+
+    @cached_property
+    def p_value(self):
+        return self._pvalue()
+
+    @cached_property
+    def test_summary(self):
+        return self._generate_result_summary()
+
+    @cached_property
+    def welch_statistic(self):
+        return self._welch_statistic()
+
+    @cached_property
+    def brown_forsythe_statistic(self):
+        return self._brown_forsythe_statistic()
+
+    def permutation_test(self, n_permutations=9999, batch_size=None, n_jobs=1, random_state=None):
+        r"""
+        Computes the p-value of the :math:`F` statistic from random permutations of the group labels
+        rather than the :math:`F` distribution.
+
+        Parameters
+        ----------
+        n_permutations : int, optional
+            Number of random permutations of the group labels. Defaults to 9999.
+        batch_size : int, optional
+            Number of permutations evaluated at once. Defaults to the number that keeps the working memory
+            of a batch near 32 MB.
+        n_jobs : int, optional
+            Number of processes computing batches concurrently. -1 uses all available processors.
+            Defaults to 1.
+        random_state : int, optional
+            Seed of the random permutations.
+
+        Returns
+        -------
+        dict
+            Dictionary containing the :math:`F` statistic, the permutation p-value and the number of
+            permutations.
+
+        Raises
+        ------
+        ValueError
+            If the analysis was created with :code:`from_summary` and the observations are not available.
+
+        Notes
+        -----
+        The permutation test does not rely on normally distributed errors, which makes it preferable to the
+        :math:`F` distribution p-value when the groups are small or skewed. With the observations centered
+        by their grand mean, the group sum of squares of a permutation only depends on its group sums
+        :math:`S_i`,
+
+        .. math::
+
+            SST = \sum_{i=1}^k \frac{S_i^2}{n_i} \qquad SSE = TotalSS - SST
+
+        so the :math:`F` statistics of a whole batch of permutations are found from one grouped sum of the
+        permuted group codes.
+
+        Examples
+        --------
+        >>> ctrl = [4.17, 5.58, 5.18]
+        >>> trt1 = [4.81, 4.17, 4.41]
+        >>> trt2 = [5.31, 5.12, 5.54]
+        >>> aov = AnovaOneWay(ctrl, trt1, trt2)
+        >>> aov.permutation_test(random_state=1)
+        {'F-statistic': 2.489558707643..., 'p-value': 0.1782, 'Permutations': 9999}
+
+        """
+        if self.design is None:
+            raise ValueError('a permutation test requires the observations, which are not available when '
+                             'the analysis is created from group summaries.')
+
+        y = self.design.values[:, 0] - np.mean(self.design.values[:, 0])
+
+        counts = self.design.counts
+        total_ss = np.sum(y ** 2)
+        dfn, dfd = self.group_degrees_of_freedom, self.residual_degrees_of_freedom
+
+        def f_statistic(sums):
+            sst = np.sum(sums ** 2 / counts, axis=1)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return (sst / dfn) / ((total_ss - sst) / dfd)
+
+        f_stat, p = permutation_test(self.design, y, f_statistic, n_permutations=n_permutations,
+                                     batch_size=batch_size, n_jobs=n_jobs, random_state=random_state)
+
+        return {'F-statistic': f_stat, 'p-value': p, 'Permutations': n_permutations}
 
     def _sse(self):
         r"""
@@ -251,13 +475,7 @@ class AnovaOneWay(object):
             Brigham Young University: John Wiley & Sons, Inc.
 
         """
-        group_n = self.group_stats['Group Observations']
-        group_variance = self.group_stats['Group Variance']
-
-        sse = 0
-
-        for i, j in zip(group_n, group_variance):
-            sse += (i[1] - 1) * j[1]
+        sse = _sum_squares(self._group_counts, self._group_means, self._group_variances)[1]
 
         return sse
 
@@ -285,14 +503,7 @@ class AnovaOneWay(object):
             Brigham Young University: John Wiley & Sons, Inc.
 
         """
-        group_n = self.group_stats['Group Observations']
-        group_means = self.group_stats['Group Means']
-        total_mean = np.mean(self.design_matrix[:, 1])
-
-        sst = 0
-
-        for i, j in zip(group_n, group_means):
-            sst += i[1] * (j[1] - total_mean) ** 2
+        sst = _sum_squares(self._group_counts, self._group_means, self._group_variances)[0]
 
         return sst
 
@@ -409,6 +620,114 @@ class AnovaOneWay(object):
 
         return p
 
+    def _welch_statistic(self):
+        r"""
+        Computes Welch's heteroscedastic :math:`F` statistic, which does not assume the groups have equal
+        variances.
+
+        Returns
+        -------
+        welch_stat : dict
+            Dictionary containing Welch's :math:`F` statistic, its degrees of freedom and p-value.
+
+        Notes
+        -----
+        Each group is weighted by the inverse of the variance of its mean, :math:`w_i = n_i / s_i^2`.
+        With :math:`W = \sum w_i` and the weighted grand mean :math:`\tilde{y} = \sum w_i \bar{y}_i / W`,
+        the statistic is defined as:
+
+        .. math::
+
+            F = \frac{\frac{1}{k - 1} \sum_{i=1}^k w_i (\bar{y}_i - \tilde{y})^2}
+            {1 + \frac{2(k - 2)}{k^2 - 1} \Lambda} \qquad
+            \Lambda = \sum_{i=1}^k \frac{(1 - w_i / W)^2}{n_i - 1}
+
+        and is approximately distributed as :math:`F_{k - 1, (k^2 - 1) / 3 \Lambda}`. Only the number of
+        observations, mean and variance of each group are needed, so the statistic is found from the same
+        group summaries as the ordinary :math:`F` statistic.
+
+        References
+        ----------
+        Welch, B. L. (1951). On the Comparison of Several Mean Values: An Alternative Approach.
+            Biometrika, 38(3/4), 330-336. https://doi.org/10.2307/2332579
+
+        """
+        counts, means, variances = self._group_counts, self._group_means, self._group_variances
+        k = self.k
+
+        w = counts / variances
+        total_w = np.sum(w)
+        weighted_mean = np.sum(w * means) / total_w
+
+        lam = np.sum((1. - w / total_w) ** 2 / (counts - 1.))
+
+        welch_f = (np.sum(w * (means - weighted_mean) ** 2) / (k - 1.)) / \
+                  (1. + 2. * (k - 2.) / (k ** 2. - 1.) * lam)
+
+        dfd = (k ** 2. - 1.) / (3. * lam)
+
+        welch_stat = {
+            'Welch F-value': welch_f,
+            'Welch p-value': f.sf(welch_f, k - 1, dfd),
+            'Numerator DoF': k - 1,
+            'Denominator DoF': dfd
+        }
+
+        return welch_stat
+
+    def _brown_forsythe_statistic(self):
+        r"""
+        Computes the Brown-Forsythe :math:`F^*` statistic for the equality of means, which does not assume the
+        groups have equal variances.
+
+        Returns
+        -------
+        brown_forsythe_stat : dict
+            Dictionary containing the Brown-Forsythe :math:`F^*` statistic, its degrees of freedom and p-value.
+
+        Notes
+        -----
+        The Brown-Forsythe statistic keeps the group sum of squares of the ordinary :math:`F` statistic in the
+        numerator and replaces the pooled residual variance with a weighting of the group variances that is
+        appropriate when they differ:
+
+        .. math::
+
+            F^* = \frac{\sum_{i=1}^k n_i(\bar{y_{i}} - \bar{y})^2}{\sum_{i=1}^k (1 - n_i / n) s_i^2}
+
+        :math:`F^*` is approximately distributed as :math:`F_{k - 1, f}`, where the denominator degrees of
+        freedom are found with Satterthwaite's approximation,
+
+        .. math::
+
+            f = \frac{\left( \sum_{i=1}^k c_i s_i^2 \right)^2}{\sum_{i=1}^k \frac{c_i^2 s_i^4}{n_i - 1}}
+            \qquad c_i = 1 - \frac{n_i}{n}
+
+        This is the Brown-Forsythe test of the equality of means rather than their test of the equality of
+        variances based on deviations from the group medians.
+
+        References
+        ----------
+        Brown, M. B., & Forsythe, A. B. (1974). The Small Sample Behavior of Some Statistics Which Test the
+            Equality of Several Means. Technometrics, 16(1), 129-132. https://doi.org/10.2307/1267501
+
+        """
+        counts, variances = self._group_counts, self._group_variances
+
+        c = (1. - counts / np.sum(counts)) * variances
+
+        bf_f = self.group_sum_squares / np.sum(c)
+        dfd = np.sum(c) ** 2 / np.sum(c ** 2 / (counts - 1.))
+
+        brown_forsythe_stat = {
+            'Brown-Forsythe F-value': bf_f,
+            'Brown-Forsythe p-value': f.sf(bf_f, self.group_degrees_of_freedom, dfd),
+            'Numerator DoF': self.group_degrees_of_freedom,
+            'Denominator DoF': dfd
+        }
+
+        return brown_forsythe_stat
+
     def _generate_result_summary(self):
         r"""
         Returns a summary of the fitted analysis of variance model as a dictionary.
@@ -438,7 +757,7 @@ class AnovaOneWay(object):
 
     def _group_statistics(self):
         r"""
-        Computes group summary statistics (mean, number of observations, and variance), for use when
+        Collects group summary statistics (mean, number of observations, and variance), for use when
         performing analysis of variance.
 
         Returns
@@ -446,20 +765,274 @@ class AnovaOneWay(object):
         group_stats : dict
             Dictionary containing each group's mean, number of observations and variance.
 
+        Notes
+        -----
+        When the analysis is fit from the observations, the counts, sums and sums of squared deviations
+        of every group are computed with vectorized grouped sums over the integer group codes rather than
+        a Python function call per group.
+
         """
-        group_means = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1], np.mean)
-        group_obs = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1], len)
-        group_variance = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1], var)
+        labels = self.group_names
 
         group_stats = {
-            'Group Means': group_means,
-            'Group Observations': group_obs,
-            'Group Variance': group_variance
+            'Group Means': list(zip(labels, self._group_means)),
+            'Group Observations': list(zip(labels, self._group_counts.tolist())),
+            'Group Variance': list(zip(labels, self._group_variances))
         }
 
         return group_stats
 
 
+class AnovaOneWayBatch(object):
+    r"""
+    Performs one-way ANOVA of many response variables against a single grouping, testing every
+    column of the response matrix at once.
+
+    Parameters
+    ----------
+    y : array-like
+        Two-dimensional array (Numpy ndarray, Pandas DataFrame, list of lists) of shape :math:`n \times p`
+        with one observation per row and one response variable per column.
+    group : array-like
+        One-dimensional array (Numpy ndarray, Pandas Series, list) of length :math:`n` that defines
+        the group membership of the observations.
+    dtype : numpy dtype, optional
+        Floating point dtype in which the responses are stored. :code:`np.float32` halves their memory,
+        while sums and cross products are still accumulated in float64. Defaults to float64.
+
+    Attributes
+    ----------
+    design : Design
+        Compact representation of the data with integer group codes, the table of group labels and
+        the response values.
+    k : int
+        The number of groups.
+    group_degrees_of_freedom : int
+        The group degrees of freedom, :code:`k - 1`.
+    residual_degrees_of_freedom : int
+        The residual degrees of freedom, :code:`n - k`.
+    group_sum_squares : numpy ndarray
+        The group (treatment) sum of squares of each response variable.
+    group_mean_squares : numpy ndarray
+        The group mean squares of each response variable.
+    residual_sum_squares : numpy ndarray
+        The residual sum of squares of each response variable.
+    residual_mean_squares : numpy ndarray
+        The residual mean squares of each response variable.
+    f_statistic : numpy ndarray
+        The :math:`F` statistic of each response variable.
+    p_value : numpy ndarray
+        The p-value of each :math:`F` statistic. Computed when first accessed.
+    analysis_type : str
+        Name of the analysis performed, 'One-Way ANOVA'.
+    test_summary : dict
+        Dictionary summarizing the analysis. Computed when first accessed.
+
+    Notes
+    -----
+    The group vector is factorized once and the counts, means and variances of every group and
+    response variable are found with grouped sums over the whole response matrix. The sums of squares
+    of each column then follow as in :code:`AnovaOneWay`:
+
+    .. math::
+
+        SST = \sum_{i=1}^k n_i(\bar{y_{i}} - \bar{y})^2 \qquad SSE = \sum_{i=1}^k (n_i - 1)s_i^2
+
+    so that the results for each column are the same as those of :code:`AnovaOneWay` run on that column.
+
+    Examples
+    --------
+    >>> group_vector = ['ctrl', 'ctrl', 'ctrl',
+    ...                 'trt1', 'trt1', 'trt1',
+    ...                 'trt2', 'trt2', 'trt2']
+    >>> y = [[4.17, 1.], [5.58, 2.], [5.18, 3.],
+    ...      [4.81, 1.], [4.17, 2.], [4.41, 3.],
+    ...      [5.31, 2.], [5.12, 3.], [5.54, 4.]]
+    >>> aov = AnovaOneWayBatch(y, group=group_vector)
+    >>> aov.f_statistic
+    array([2.48955871, 1.        ])
+    >>> aov.p_value
+    array([0.16321177, 0.421875  ])
+
+    See Also
+    --------
+    AnovaOneWay : class for performing one-way ANOVA of a single response variable.
+
+    """
+    def __init__(self, y, group, dtype=np.float64):
+
+        self.design = build_design(y, group=group, dtype=dtype)
+        self.group = group
+
+        self.k = self.design.k
+        self.group_degrees_of_freedom = self.k - 1
+        self.residual_degrees_of_freedom = self.design.n - self.k
+
+        counts, means, variances = self.design.group_moments()
+
+        self.group_sum_squares, self.residual_sum_squares = _sum_squares(counts, means, variances)
+
+        self.group_mean_squares = self.group_sum_squares / self.group_degrees_of_freedom
+        self.residual_mean_squares = self.residual_sum_squares / self.residual_degrees_of_freedom
+
+        self.f_statistic = self.group_mean_squares / self.residual_mean_squares
+        self.analysis_type = 'One-Way ANOVA'
+
+    @cached_property
+    def p_value(self):
+        return f.sf(self.f_statistic, self.group_degrees_of_freedom, self.residual_degrees_of_freedom)
+
+    @cached_property
+    def test_summary(self):
+        return {
+            'Analysis Performed': self.analysis_type,
+            'F-statistic': self.f_statistic,
+            'p-value': self.p_value,
+            'Group DoF': self.group_degrees_of_freedom,
+            'Residual DoF': self.residual_degrees_of_freedom,
+            'Group Sum of Squares': self.group_sum_squares,
+            'Group Mean Squares': self.group_mean_squares,
+            'Residual Sum of Squares': self.residual_sum_squares,
+            'Residual Mean Squares': self.residual_mean_squares
+        }
+
+
+class GroupMoments(object):
+    r"""
+    Mergeable per-group counts, means and sums of squared deviations for computing a one-way ANOVA over
+    data that is split into chunks or shards.
+
+    Attributes
+    ----------
+    labels : numpy ndarray
+        The distinct group labels seen so far, in sorted order.
+    counts : numpy ndarray
+        The number of observations of each group.
+    means : numpy ndarray
+        The mean of each group.
+    m2 : numpy ndarray
+        The sum of squared deviations from the mean of each group.
+
+    Notes
+    -----
+    Each chunk of observations is summarized with one grouped pass and combined with the current state
+    group by group with the pairwise update of Chan, Golub and LeVeque. Two states are merged the same way,
+    so that shards can be summarized independently and only :math:`O(k)` numbers need be combined. The
+    means and sums of squared deviations are kept rather than the raw sums and sums of squares to avoid the
+    cancellation of the textbook one pass formula.
+
+    The combined state is passed to :code:`AnovaOneWay.from_summary` by :code:`anova`.
+
+    Examples
+    --------
+    >>> shard1, shard2 = GroupMoments(), GroupMoments()
+    >>> shard1.update([4.17, 5.58, 4.81, 4.17], group=['ctrl', 'ctrl', 'trt1', 'trt1'])
+    >>> shard2.update([5.18, 4.41, 5.31, 5.12, 5.54], group=['ctrl', 'trt1', 'trt2', 'trt2', 'trt2'])
+    >>> aov = shard1.merge(shard2).anova()
+    >>> aov.f_statistic
+    2.489558707643...
+
+    References
+    ----------
+    Chan, T., Golub, G., & LeVeque, R. (1983). Algorithms for Computing the Sample Variance:
+        Analysis and Recommendations. The American Statistician, 37(3), 242-247.
+        http://dx.doi.org/10.1080/00031305.1983.10483115
+
+    """
+    def __init__(self):
+        self.labels = None
+        self.counts = np.zeros(0, dtype=np.intp)
+        self.means = np.zeros(0)
+        self.m2 = np.zeros(0)
+
+    @property
+    def variances(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.counts > 1, self.m2 / (self.counts - 1), np.nan)
+
+    def update(self, y, group):
+        r"""
+        Adds a chunk of observations to the state.
+
+        Parameters
+        ----------
+        y : array-like
+            One-dimensional array of the observations.
+        group : array-like
+            One-dimensional array of the group of each observation.
+
+        """
+        design = build_design(y, group=group)
+        counts, means, variances = design.group_moments(design.values[:, 0])
+
+        m2 = np.where(counts > 1, (counts - 1) * variances, 0.)
+
+        self._combine(design.labels, counts, means, m2)
+
+    def merge(self, other):
+        r"""
+        Merges the state of another :code:`GroupMoments` into this one.
+
+        Parameters
+        ----------
+        other : GroupMoments
+            The state to merge.
+
+        Returns
+        -------
+        GroupMoments
+            The merged state, :code:`self`.
+
+        """
+        if other.labels is not None:
+            self._combine(other.labels, other.counts, other.means, other.m2)
+
+        return self
+
+    def anova(self):
+        r"""
+        Performs one-way ANOVA of the accumulated observations.
+
+        Returns
+        -------
+        AnovaOneWay
+            The fitted analysis, equal to that of :code:`AnovaOneWay` run on all the observations.
+
+        """
+        return AnovaOneWay.from_summary(self.counts, means=self.means, variances=self.variances,
+                                        labels=self.labels)
+
+    def _combine(self, labels_b, n_b, mean_b, m2_b):
+        if self.labels is None:
+            self.labels, self.counts, self.means, self.m2 = labels_b, n_b, mean_b, m2_b
+
+            return
+
+        labels = np.union1d(self.labels, labels_b)
+
+        n_a, mean_a, m2_a = (np.zeros(labels.shape[0], dtype=np.intp), np.zeros(labels.shape[0]),
+                             np.zeros(labels.shape[0]))
+
+        pos = np.searchsorted(labels, self.labels)
+        n_a[pos], mean_a[pos], m2_a[pos] = self.counts, self.means, self.m2
+
+        pos = np.searchsorted(labels, labels_b)
+        n = n_a.copy()
+        n[pos] += n_b
+
+        delta = np.zeros(labels.shape[0])
+        delta[pos] = mean_b - mean_a[pos]
+
+        weight = np.zeros(labels.shape[0])
+        weight[pos] = n_b / n[pos]
+
+        self.means = mean_a + delta * weight
+        self.m2 = m2_a + delta ** 2 * n_a * weight
+        self.m2[pos] += m2_b
+
+        self.labels, self.counts = labels, n
+
+
 class ManovaOneWay(object):
     r"""
     Performs multivariate analysis of variance, also known as MANOVA. Multivariate analysis of variance is
@@ -475,11 +1048,17 @@ class ManovaOneWay(object):
         as the group parameter. If the group parameter is None, each observation vector
         will be treated as a group sample vector. If only one sample vector is passed with a group
         variable, one-way MANOVA will be performed.
+    dtype : numpy dtype, optional
+        Floating point dtype in which the responses are stored. :code:`np.float32` halves their memory,
+        while sums and cross products are still accumulated in float64. Defaults to float64.
 
     Attributes
     ----------
+    design : Design
+        Compact representation of the data with integer group codes, the table of group labels and
+        the response values.
     design_matrix : array-like
-        Numpy ndarray representing the data matrix for the analysis.
+        Numpy ndarray representing the data matrix for the analysis. Built from :code:`design` when accessed.
     group_names: array-like
         Numpy array of the group names.
     k : int
@@ -510,6 +1089,11 @@ class ManovaOneWay(object):
         F-statistic and p-value.
     analysis_type : str
         String denoting the type of analysis performed. Currently only returns 'One-Way MANOVA'
+    test_summary : dict
+        Dictionary summarizing the analysis and the four test statistics.
+
+    The four test statistics and :code:`test_summary` are computed when they are first accessed and then
+    cached, so only the statistics that are read are computed.
 
     Notes
     -----
@@ -628,9 +1212,9 @@ class ManovaOneWay(object):
             [1.06666667, 2.389     , 4.33      , 1.20533333],
             [0.97      , 1.95066667, 3.55      , 0.732     ]]),
      'Group Num. Observations': [3, 3, 3, 3, 3, 3],
-     'Hotellings T^2': {'Hotellings T^2 F-value': 13.787005512065765,
+     'Hotellings T^2': {'Hotellings T^2 F-value': 2.15378932875615,
       'Hotellings T^2 Statistic': 5.743438210016407,
-      'Hotellings T^2 p-value': 0.0001270639867039236},
+      'Hotellings T^2 p-value': 0.12822673763406667},
      'Observation Total Means': array([1.07444444, 2.52194444, 4.07833333, 1.0445    ]),
      'Observations': {'x means': array([1.07444444, 2.52194444, 4.07833333, 1.0445    ]),
       'x observations': 4},
@@ -657,32 +1241,58 @@ class ManovaOneWay(object):
         Brigham Young University: John Wiley & Sons, Inc.
 
     """
-    def __init__(self, *args, group):
+    def __init__(self, *args, group, dtype=np.float64):
 
-        self.design_matrix = build_des_mat(*args, group=group)
+        self.design = build_design(*args, group=group, dtype=dtype)
 
         if group is not None:
             self.group = group
         else:
-            self.group = self.design_matrix[:, 0]
+            self.group = self.design.group_vector()
 
-        self.k = len(np.unique(self.group))
+        self.group_names = self.design.labels
+        self.k = self.design.k
 
         self.group_stats = self._group_statistics()
         self.observation_stats = self._obs_statistics()
 
-        self.hypothesis_matrix, self.error_matrix = self._hypothesis_error_matrix()
-        self._intermediate_statistic_parameters = self._intermediate_test_statistic_parameters()
+        self._set_scatter_matrices(*self._hypothesis_error_matrix())
+
+    @property
+    def design_matrix(self):
+        return self.design.to_matrix()
+
+    def _set_scatter_matrices(self, h, e):
+        self.hypothesis_matrix, self.error_matrix = h, e
 
         self.degrees_of_freedom = self._degrees_of_freedom()
         self.numerator_dof = self.degrees_of_freedom['Numerator Degrees of Freedom']
         self.denominator_dof = self.degrees_of_freedom['Denominator Degrees of Freedom']
-        self.pillai_statistic = self._pillai_statistic()
-        self.wilks_lambda = self._wilks_statistic()
-        self.roys_statistic = self._roys_statistic()
-        self.hotelling_t2_statistic = self._hotelling_t2_statistic()
         self.analysis_type = 'One-Way MANOVA'
-        self.test_summary = self._generate_result_summary()
+
+    @cached_property
+    def pillai_statistic(self):
+        return self._pillai_statistic()
+
+    @cached_property
+    def wilks_lambda(self):
+        return self._wilks_statistic()
+
+    @cached_property
+    def roys_statistic(self):
+        return self._roys_statistic()
+
+    @cached_property
+    def hotelling_t2_statistic(self):
+        return self._hotelling_t2_statistic()
+
+    @cached_property
+    def test_summary(self):
+        return self._generate_result_summary()
+
+    @cached_property
+    def _intermediate_statistic_parameters(self):
+        return self._intermediate_test_statistic_parameters()
 
     def _hypothesis_error_matrix(self):
         r"""
@@ -691,7 +1301,7 @@ class ManovaOneWay(object):
         Returns
         -------
         h, e : array-like
-            The :math:`k \times k` 'hypothesis' and 'error' matrix of the MANOVA design.
+            The :math:`p \times p` 'hypothesis' and 'error' matrix of the MANOVA design.
 
         Notes
         -----
@@ -751,6 +1361,19 @@ class ManovaOneWay(object):
             SPE_{23} = \sum_{i=1}^k \sum_{j=1}^n (y_{ij2} - \bar{y}_{i.2}) (y_{ij3} - \bar{y}_{i.3}) =
             \sum_{ij} y_{ij2} y_{ij3} - sum_{i} \frac{y_{i.2} y_{i.3}}{n}
 
+        Both matrices are computed at once with matrix products. Writing :math:`B` for the :math:`k \times p`
+        matrix of the group mean deviations :math:`\bar{y}_{i.} - \bar{y}_{..}`, each row scaled by
+        :math:`\sqrt{n_i}`, and :math:`W` for the :math:`n \times p` matrix of the observations centered by
+        their group means, :math:`y_{ij} - \bar{y}_{i.}`,
+
+        .. math::
+
+            H = B^{\prime} B \qquad E = W^{\prime} W
+
+        which weights each group by its own number of observations when the design is unbalanced. The
+        product :math:`W^{\prime} W` is accumulated in float64 over blocks of rows, so :math:`W` is never
+        held in memory in full.
+
         References
         ----------
         Rencher, A. (n.d.). Methods of Multivariate Analysis (2nd ed.).
@@ -760,24 +1383,10 @@ class ManovaOneWay(object):
         groupmeans = self.group_stats['Group Means']
         xmeans = self.observation_stats['x means']
 
-        n = self.group_stats['Group Observations']
-        xn = len(xmeans)
-
-        h, e = np.zeros((xn, xn)), np.zeros((xn, xn))
-
-        for i in np.arange(xn):
-            for j in np.arange(i + 1):
+        between = (groupmeans - xmeans) * np.sqrt(self.design.counts)[:, np.newaxis]
 
-                h[i, j] = n[i] * np.sum((groupmeans[:, i] - xmeans[i]) * (groupmeans[:, j] - xmeans[j]))
-                h[j, i] = n[i] * np.sum((groupmeans[:, j] - xmeans[j]) * (groupmeans[:, i] - xmeans[i]))
-
-                b = []
-
-                for k in self.group_stats['Groups']:
-                    a = np.sum((k[:, i] - np.mean(k[:, i])) * (k[:, j] - np.mean(k[:, j])))
-                    b.append(a)
-
-                e[i, j], e[j, i] = np.sum(b), np.sum(b)
+        h = np.dot(between.T, between)
+        e = scatter_matrix(self.design.values, groupmeans, self.design.codes)
 
         return h, e
 
@@ -822,11 +1431,12 @@ class ManovaOneWay(object):
             Brigham Young University: John Wiley & Sons, Inc.
 
         """
-        nn, s, m = self._intermediate_statistic_parameters['nn'], self._intermediate_statistic_parameters['s'], \
-                   self._intermediate_statistic_parameters['m']
+        nn, s, m, eigs = self._intermediate_statistic_parameters['nn'], \
+                         self._intermediate_statistic_parameters['s'], \
+                         self._intermediate_statistic_parameters['m'], \
+                         self._intermediate_statistic_parameters['eigs']
 
-        pillai = np.sum(np.diag(np.dot(np.linalg.inv(self.hypothesis_matrix + self.error_matrix),
-                                       self.hypothesis_matrix)))
+        pillai = np.sum(eigs / (1. + eigs))
 
         pillai_f = ((2. * nn + s + 1.) * pillai) / ((2. * m + s + 1.) * (s - pillai))
 
@@ -976,13 +1586,13 @@ class ManovaOneWay(object):
             Brigham Young University: John Wiley & Sons, Inc.
 
         """
-        dot_inve_h, s, nn, m = self._intermediate_statistic_parameters['dot_inve_h'], \
-                               self._intermediate_statistic_parameters['s'], \
-                               self._intermediate_statistic_parameters['nn'], \
-                               self._intermediate_statistic_parameters['m']
+        eigs, s, nn, m = self._intermediate_statistic_parameters['eigs'], \
+                         self._intermediate_statistic_parameters['s'], \
+                         self._intermediate_statistic_parameters['nn'], \
+                         self._intermediate_statistic_parameters['m']
 
-        t2 = np.sum(np.diag(dot_inve_h))
-        t2_f = (2. * (s * nn + 1.) * np.sum(dot_inve_h)) / (s ** 2. * (2. * m + s + 1.))
+        t2 = np.sum(eigs)
+        t2_f = (2. * (s * nn + 1.) * t2) / (s ** 2. * (2. * m + s + 1.))
 
         t2_stat = {
             "Hotellings T^2 Statistic": t2,
@@ -1038,7 +1648,6 @@ class ManovaOneWay(object):
 
         """
         group_stats = self.group_stats
-        group_stats.pop('Groups')
 
         manova_result = {
             'Analysis Performed': self.analysis_type,
@@ -1057,23 +1666,18 @@ class ManovaOneWay(object):
         return manova_result
 
     def _group_statistics(self):
-        group_means = npi.group_by(self.design_matrix[:, 0]).mean(self.design_matrix[:, 1:])[1]
-
-        group_observations = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1:], len)
-        group_observations = [i for _, i in group_observations]
-
-        groups = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1:])[1]
+        group_means = self.design.group_sums() / self.design.counts[:, np.newaxis]
+        group_observations = self.design.counts.tolist()
 
         group_stats = {
             'Group Means': group_means,
-            'Group Observations': group_observations,
-            'Groups': groups
+            'Group Observations': group_observations
         }
 
         return group_stats
 
     def _obs_statistics(self):
-        x_means = self.design_matrix[:, 1:].mean(axis=0)
+        x_means = self.design.values.mean(axis=0, dtype=np.float64)
         x_group_observations = len(x_means)
 
         obs_stats = {
@@ -1085,11 +1689,10 @@ class ManovaOneWay(object):
 
     def _intermediate_test_statistic_parameters(self):
 
-        dot_inve_h = self._dot_inve_h(self.hypothesis_matrix, self.error_matrix)
-        eigs = np.linalg.eigvals(dot_inve_h)
+        eigs = self._eigenvalues(self.hypothesis_matrix, self.error_matrix)
 
         p = len(self.error_matrix)
-        n = self.design_matrix.shape[0]
+        n = self.design.n
 
         vh = self.k - 1.
         ve = n - self.k
@@ -1099,7 +1702,6 @@ class ManovaOneWay(object):
         nn = 0.5 * (ve - p - 1)
 
         intermediate_statistic_parameters = {
-            'dot_inve_h': dot_inve_h,
             'eigs': eigs,
             'p': p,
             'n': n,
@@ -1113,11 +1715,7 @@ class ManovaOneWay(object):
         return intermediate_statistic_parameters
 
     def _degrees_of_freedom(self):
-        vh, ve, xn = self._intermediate_statistic_parameters['vh'], \
-                     self._intermediate_statistic_parameters['ve'], \
-                     len(self.observation_stats['x means'])
-
-        num_df, denom_df = vh, ve
+        num_df, denom_df = self.k - 1., self.design.n - self.k
 
         dof = {'Numerator Degrees of Freedom': num_df,
                'Denominator Degrees of Freedom': denom_df}
@@ -1125,5 +1723,186 @@ class ManovaOneWay(object):
         return dof
 
     @staticmethod
-    def _dot_inve_h(h, e):
-        return np.dot(np.linalg.inv(e), h)
+    def _eigenvalues(h, e):
+        r"""
+        Computes the eigenvalues of :math:`E^{-1}H` without forming an inverse.
+
+        Parameters
+        ----------
+        h, e : array-like
+            The hypothesis and error matrices.
+
+        Returns
+        -------
+        eigs : numpy ndarray
+            The real, non-negative eigenvalues of :math:`E^{-1}H` in descending order.
+
+        Raises
+        ------
+        ValueError
+            If the error matrix is not positive definite, for example when there are fewer residual
+            degrees of freedom than dependent variables.
+
+        Notes
+        -----
+        The eigenvalues of :math:`E^{-1}H` are those of the symmetric generalized eigenproblem
+        :math:`H v = \lambda E v`. With the Cholesky factorization :math:`E = LL^{\prime}`, this is the
+        ordinary eigenproblem of the symmetric matrix :math:`L^{-1} H L^{-\prime}`, which is solved with
+        triangular solves rather than inverting :math:`E`. The eigenvalues are therefore real, and values
+        below zero can only come from rounding of the zero eigenvalues and are set to zero.
+
+        """
+        try:
+            eigs = eigh(h, e, eigvals_only=True)
+        except np.linalg.LinAlgError:
+            raise ValueError('the error matrix is not positive definite; the MANOVA statistics are not '
+                             'defined for these data.')
+
+        return np.clip(eigs, 0., None)[::-1]
+
+
+class ManovaOneWayBatch(object):
+    r"""
+    Performs one-way MANOVA of the same response variables against each of many grouping factors.
+
+    Parameters
+    ----------
+    y : array-like
+        Two-dimensional array (Numpy ndarray, Pandas DataFrame, list of lists) of shape :math:`n \times p`
+        with one observation per row and one dependent variable per column.
+    groups : array-like or dict
+        The grouping factors. A Pandas DataFrame or two-dimensional array with one grouping factor of length
+        :math:`n` per column, or a dictionary mapping the name of each factor to its group vector.
+    dtype : numpy dtype, optional
+        Floating point dtype in which the responses are stored. :code:`np.float32` halves their memory,
+        while sums and cross products are still accumulated in float64. Defaults to float64.
+
+    Attributes
+    ----------
+    factor_names : list
+        The name of each grouping factor: the DataFrame columns or dictionary keys, otherwise the column
+        positions.
+    total_matrix : numpy ndarray
+        The :math:`p \times p` total scatter matrix :math:`T = H + E`, shared by all the factors.
+    results : dict
+        Dictionary mapping each factor name to its :code:`ManovaOneWay` result.
+    test_summary : dict
+        Dictionary mapping each factor name to the :code:`test_summary` of its result. Computed when first
+        accessed.
+
+    Notes
+    -----
+    The total scatter of the observations about their grand mean,
+
+    .. math::
+
+        T = \sum_{i=1}^k \sum_{j=1}^{n_i} (y_{ij} - \bar{y}_{..}) (y_{ij} - \bar{y}_{..})^{\prime} = H + E
+
+    does not depend on the grouping, so it is computed once. For each factor, the group sums
+    :math:`S_i = \sum_j (y_{ij} - \bar{y}_{..})` of the centered observations are found with one grouped
+    pass, after which
+
+    .. math::
+
+        H = \sum_{i=1}^k \frac{S_i S_i^{\prime}}{n_i} \qquad E = T - H
+
+    so that the work per factor beyond the grouped sums is :math:`O(kp^2)`. The test statistics of each
+    result are computed when first accessed, as in :code:`ManovaOneWay`. As :math:`E` is found by
+    subtraction, it loses relative precision when the groups explain nearly all the variation of the data.
+
+    Examples
+    --------
+    >>> rng = np.random.RandomState(1)
+    >>> y = rng.normal(size=(60, 3))
+    >>> factors = {'site': rng.randint(0, 3, 60), 'batch': rng.randint(0, 4, 60)}
+    >>> maov = ManovaOneWayBatch(y, factors)
+    >>> maov.results['site'].wilks_lambda['Wilks Lambda']
+    0.88817737...
+
+    See Also
+    --------
+    ManovaOneWay : class for performing one-way MANOVA against a single grouping factor.
+
+    """
+    def __init__(self, y, groups, dtype=np.float64):
+
+        if isinstance(y, (pd.DataFrame, pd.Series)):
+            y = y.values
+
+        if not np.issubdtype(np.dtype(dtype), np.floating):
+            raise ValueError('dtype must be a floating point dtype.')
+
+        values = np.asarray(y, dtype=dtype)
+
+        if values.ndim == 1:
+            values = values[:, np.newaxis]
+
+        values = np.ascontiguousarray(values)
+        n = values.shape[0]
+
+        if isinstance(groups, dict):
+            self.factor_names, factors = list(groups.keys()), list(groups.values())
+        elif isinstance(groups, pd.DataFrame):
+            self.factor_names, factors = list(groups.columns), [groups[c].values for c in groups.columns]
+        else:
+            groups = np.asarray(groups)
+
+            if groups.ndim == 1:
+                groups = groups[:, np.newaxis]
+
+            self.factor_names, factors = list(range(groups.shape[1])), list(groups.T)
+
+        x_means = values.mean(axis=0, dtype=np.float64)
+        centered = values - x_means.astype(values.dtype)
+
+        self.total_matrix = scatter_matrix(values, x_means)
+
+        observation_stats = {
+            'x means': x_means,
+            'x observations': len(x_means)
+        }
+
+        self.results = {}
+
+        for name, group in zip(self.factor_names, factors):
+            group = np.asarray(group)
+
+            if group.shape[0] != n:
+                raise ValueError('each grouping factor must have one entry per observation.')
+
+            codes, labels = pd.factorize(group, sort=True)
+            design = Design(codes, np.asarray(labels), values)
+
+            sums = design.group_sums(centered)
+            scaled = sums / np.sqrt(design.counts)[:, np.newaxis]
+            h = np.dot(scaled.T, scaled)
+
+            maov = ManovaOneWay.__new__(ManovaOneWay)
+            maov.design, maov.group = design, group
+            maov.group_names, maov.k = design.labels, design.k
+            maov.group_stats = {
+                'Group Means': sums / design.counts[:, np.newaxis] + x_means,
+                'Group Observations': design.counts.tolist()
+            }
+            maov.observation_stats = observation_stats
+            maov._set_scatter_matrices(h, self.total_matrix - h)
+
+            self.results[name] = maov
+
+    @cached_property
+    def test_summary(self):
+        return {name: result.test_summary for name, result in self.results.items()}
+
+
+def _sum_squares(counts, means, variances):
+    if means.ndim > 1:
+        counts = counts[:, np.newaxis]
+
+    total_mean = np.sum(counts * means, axis=0) / np.sum(counts, axis=0)
+
+    sst = np.sum(counts * (means - total_mean) ** 2, axis=0)
+
+    # Groups with a single observation have an undefined variance but add nothing to the SSE.
+    sse = np.sum(np.where(counts > 1, (counts - 1) * variances, 0.), axis=0)
+
+    return sst, sse
@@ -15,6 +15,18 @@ Critical Value Lookup Functions
     chi_square_critical_value
     u_critical_value
 
+Exact Null Distributions
+------------------------
+
+.. autosummary::
+    :toctree: generated/
+
+    u_distribution
+    u_exact_p_value
+    u_exact_critical_value
+    w_distribution
+    w_exact_p_value
+
 Critical Value Tables
 ---------------------
 
@@ -27,7 +39,11 @@ Critical Value Tables
 
 """
 
+from functools import lru_cache
+
+import numpy as np
 from numpy import nan
+from scipy.special import gammaln
 
 
 def chi_square_critical_value(alpha, dof):
@@ -149,6 +165,368 @@ def u_critical_value(n, m, alpha):
     return u_crit
 
 
+def u_distribution(n, m):
+    r"""
+    Computes the exact null distribution of the Mann-Whitney :math:`U`-statistic of two samples without
+    ties.
+
+    Parameters
+    ----------
+    n : int
+        Number of observations in first sample group.
+    m : int
+        Number of observations in second sample group.
+
+    Returns
+    -------
+    cdf : numpy ndarray
+        Read-only array of :math:`P(U \leq u)` for :math:`u = 0, 1, \cdots, \lfloor nm / 2 \rfloor`. The
+        upper half of the distribution follows from its symmetry, :math:`P(U \geq u) = P(U \leq nm - u)`.
+
+    Raises
+    ------
+    ValueError
+        If the number of arrangements of the samples, :math:`\binom{n + m}{n}`, exceeds :math:`10^{300}`
+        (about :math:`n = m = 500`), beyond which the probabilities underflow.
+
+    Notes
+    -----
+    Under the null hypothesis each of the :math:`\binom{n + m}{n}` arrangements of the two samples is
+    equally likely. The number of arrangements :math:`f(u; n, m)` giving :math:`U = u` follows the counting
+    recurrence
+
+    .. math::
+
+        f(u; n, m) = f(u - m; n - 1, m) + f(u; n, m - 1)
+
+    whose generating function is the Gaussian binomial coefficient
+
+    .. math::
+
+        \sum_u f(u; n, m) q^u = \prod_{i=1}^{n} \frac{1 - q^{m + i}}{1 - q^i}
+
+    The distribution is built one factor of the product at a time, each a shifted difference followed by
+    a strided cumulative sum, and rescaled after each factor so that it stays a probability distribution
+    and cannot overflow. Only the lower half of the distribution is computed. The work is
+    :math:`O(n^2 m)` for :math:`n \leq m` and the results are kept in a bounded cache keyed by the sample
+    sizes, so repeated comparisons of samples of the same sizes are not recomputed.
+
+    Examples
+    --------
+    >>> u_distribution(3, 3)
+    array([0.05, 0.1 , 0.2 , 0.35, 0.5 ])
+
+    References
+    ----------
+    Mann, H. B.; Whitney, D. R. (1947). On a Test of Whether one of Two Random Variables is Stochastically
+        Larger than the Other. Annals of Mathematical Statistics, 18 (1), 50-60.
+
+    """
+    n, m = int(n), int(m)
+
+    if n < 1 or m < 1:
+        raise ValueError('the sample sizes must be positive.')
+    if gammaln(n + m + 1) - gammaln(n + 1) - gammaln(m + 1) > 690.:
+        raise ValueError('the exact distribution of U is only available while the number of arrangements of '
+                         'the samples is below 1e300 (about n = m = 500).')
+
+    return _u_cdf(min(n, m), max(n, m))
+
+
+def u_exact_p_value(u, n, m, alternative='two-tail'):
+    r"""
+    Computes the exact p-value of the Mann-Whitney :math:`U`-statistic of two samples without ties.
+
+    Parameters
+    ----------
+    u : float
+        The :math:`U`-statistic of either sample.
+    n : int
+        Number of observations in first sample group.
+    m : int
+        Number of observations in second sample group.
+    alternative : str, {'two-tail', 'one-tail'}
+        Alternative hypothesis. 'one-tail' gives the probability of a :math:`U` at least as far into the
+        tail as the observed, 'two-tail' (default) doubles it.
+
+    Returns
+    -------
+    p : float
+        The exact p-value.
+
+    Raises
+    ------
+    ValueError
+        If parameter :code:`alternative` is not one of 'one-tail' or 'two-tail'.
+
+    Examples
+    --------
+    >>> u_exact_p_value(10, 5, 5)
+    0.6904761904761905
+
+    """
+    if alternative not in ('one-tail', 'two-tail'):
+        raise ValueError("alternative must be one of 'one-tail' or 'two-tail'.")
+
+    cdf = u_distribution(n, m)
+    u = int(np.floor(min(u, n * m - u)))
+
+    p = cdf[u] if u >= 0 else 0.
+
+    if alternative == 'two-tail':
+        p = min(1., 2. * p)
+
+    return float(p)
+
+
+def u_exact_critical_value(n, m, alpha, alternative='one-tail'):
+    r"""
+    Finds the exact Mann-Whitney :math:`U`-statistic critical value for any alpha-level.
+
+    Parameters
+    ----------
+    n : int
+        Number of observations in first sample group.
+    m : int
+        Number of observations in second sample group.
+    alpha : float
+        Alpha-level, between 0 and 1.
+    alternative : str, {'one-tail', 'two-tail'}
+        Alternative hypothesis. With 'two-tail', :code:`alpha` is split evenly between the tails. Defaults
+        to 'one-tail', the convention of :code:`u_critical_value`.
+
+    Returns
+    -------
+    u_crit : int or nan
+        The largest :math:`u` with :math:`P(U \leq u) \leq \alpha`. The null hypothesis is rejected if
+        :math:`U \leq u_{crit}`. :code:`nan` if even :math:`U = 0` is more likely than :math:`\alpha`.
+
+    Raises
+    ------
+    ValueError
+        If parameter :code:`alpha` is not between 0 and 1.
+    ValueError
+        If parameter :code:`alternative` is not one of 'one-tail' or 'two-tail'.
+
+    Notes
+    -----
+    Unlike :code:`u_critical_value`, the critical value is found from the exact null distribution given by
+    :code:`u_distribution` rather than a table, and so is available for any alpha-level and for sample
+    sizes into the hundreds. It reproduces :code:`u_critical_value_table` apart from a few entries of the
+    table that differ from the exact distribution.
+
+    Examples
+    --------
+    >>> u_exact_critical_value(10, 12, 0.01)
+    24
+    >>> u_exact_critical_value(40, 60, 0.005, 'two-tail')
+    803
+
+    """
+    if isinstance(alpha, str):
+        alpha = float(alpha)
+
+    if not 0 < alpha < 1:
+        raise ValueError('alpha must be between 0 and 1.')
+    if alternative not in ('one-tail', 'two-tail'):
+        raise ValueError("alternative must be one of 'one-tail' or 'two-tail'.")
+
+    if alternative == 'two-tail':
+        alpha /= 2.
+
+    cdf = u_distribution(n, m)
+
+    # Allow for rounding in the cumulative sums when alpha falls exactly on a probability of the distribution.
+    u_crit = int(np.searchsorted(cdf, alpha * (1. + 1e-10), side='right')) - 1
+
+    if u_crit < 0:
+        return nan
+
+    return u_crit
+
+
+@lru_cache(maxsize=128)
+def _u_cdf(n, m):
+    half = n * m // 2
+
+    pmf = np.zeros(half + 1)
+    pmf[0] = 1.
+
+    for i in range(1, n + 1):
+        shift = m + i
+
+        # Multiply by (1 - q^(m + i)), then divide by (1 - q^i) with a cumulative sum over every i-th term.
+        if shift <= half:
+            pmf[shift:] -= pmf[:half + 1 - shift].copy()
+
+        rows = -(-(half + 1) // i)
+
+        strided = np.zeros(rows * i)
+        strided[:half + 1] = pmf
+
+        pmf = np.cumsum(strided.reshape(rows, i), axis=0).ravel()[:half + 1]
+        pmf *= i / float(m + i)
+
+    cdf = np.cumsum(pmf)
+    cdf.setflags(write=False)
+
+    return cdf
+
+
+def w_distribution(n):
+    r"""
+    Computes the exact null distribution of the Wilcoxon signed rank :math:`V`-statistic of a sample
+    without ties or zero differences.
+
+    Parameters
+    ----------
+    n : int
+        The number of sample observations.
+
+    Returns
+    -------
+    cdf : numpy ndarray
+        Read-only array of :math:`P(V \leq v)` for :math:`v = 0, 1, \cdots, n(n + 1) / 2`.
+
+    Raises
+    ------
+    ValueError
+        If parameter :code:`n` is less than 1.
+
+    Notes
+    -----
+    Under the null hypothesis each rank :math:`1, \cdots, n` enters :math:`V` with probability
+    :math:`\frac{1}{2}` independently of the others, so the generating function of the distribution is
+
+    .. math::
+
+        \prod_{i=1}^n \frac{1 + q^i}{2}
+
+    which is built one factor at a time by dynamic programming in :math:`O(n^3)` operations. The
+    distribution is cached per :math:`n`, so it is computed once for all the tests of samples of the same
+    size.
+
+    Examples
+    --------
+    >>> w_distribution(3)
+    array([0.125, 0.25 , 0.375, 0.625, 0.75 , 0.875, 1.   ])
+
+    References
+    ----------
+    Wilcoxon, F. (1945). Individual Comparisons by Ranking Methods. Biometrics Bulletin, 1(6), 80-83.
+
+    """
+    n = int(n)
+
+    if n < 1:
+        raise ValueError('the sample size must be positive.')
+
+    return _w_cdf(tuple(range(1, n + 1)))
+
+
+def w_exact_p_value(v, n, alternative='two-tail', ranks=None):
+    r"""
+    Computes the exact p-value of the Wilcoxon signed rank :math:`V`-statistic.
+
+    Parameters
+    ----------
+    v : float
+        The sum of the ranks of the positive differences.
+    n : int
+        The number of nonzero differences.
+    alternative : str, {'two-tail', 'greater', 'less'}
+        Alternative hypothesis. 'greater' gives :math:`P(V \geq v)`, 'less' gives :math:`P(V \leq v)` and
+        'two-tail' (default) doubles the smaller of the two.
+    ranks : array-like, optional
+        The ranks of the absolute nonzero differences. Only needed if they contain ties, in which case the
+        distribution is that of the given average ranks.
+
+    Returns
+    -------
+    p : float
+        The exact p-value.
+
+    Raises
+    ------
+    ValueError
+        If parameter :code:`alternative` is not one of 'two-tail', 'greater' or 'less'.
+    ValueError
+        If parameter :code:`ranks` does not have :code:`n` values that are multiples of :math:`\frac{1}{2}`.
+
+    Notes
+    -----
+    Average ranks are multiples of :math:`\frac{1}{2}`, so with ties the distribution is found with the
+    recurrence of :code:`w_distribution` over the doubled ranks. It is cached per set of ranks.
+
+    The distribution of :math:`V` is symmetric about half the sum of the ranks, so both tails are read
+    from the lower tail of the cumulative distribution and keep their precision far into the tails.
+
+    Examples
+    --------
+    >>> w_exact_p_value(3, 10)
+    0.009765625
+    >>> w_exact_p_value(5.5, 6, ranks=[1.5, 1.5, 3, 4, 5, 6])
+    0.34375
+
+    """
+    if alternative not in ('two-tail', 'greater', 'less'):
+        raise ValueError("alternative must be one of 'two-tail', 'greater' or 'less'.")
+
+    n = int(n)
+
+    if ranks is None:
+        scale, weights = 1, tuple(range(1, n + 1))
+    else:
+        doubled = 2. * np.asarray(ranks, dtype=np.float64).ravel()
+
+        if doubled.shape[0] != n or np.any(doubled != np.round(doubled)):
+            raise ValueError('ranks must hold n multiples of 1/2.')
+
+        scale, weights = 2, tuple(int(r) for r in np.sort(doubled))
+
+    if n < 1:
+        return 1.
+
+    cdf = _w_cdf(weights)
+
+    v = int(np.round(scale * v))
+    total = cdf.shape[0] - 1
+
+    # The distribution is symmetric about total / 2, so the upper tail is read from the lower tail rather
+    # than subtracted from one, which would lose the small probabilities of large samples.
+    lower = cdf[min(v, total)] if v >= 0 else 0.
+    upper = cdf[min(total - v, total)] if v <= total else 0.
+
+    if alternative == 'less':
+        p = lower
+    elif alternative == 'greater':
+        p = upper
+    else:
+        p = min(1., 2. * min(lower, upper))
+
+    return float(p)
+
+
+@lru_cache(maxsize=128)
+def _w_cdf(weights):
+    pmf = np.zeros(sum(weights) + 1)
+    pmf[0] = 1.
+
+    top = 0
+
+    for w in weights:
+        # Multiply by (1 + q^w) / 2 over the support reached so far.
+        pmf[w:top + w + 1] += pmf[:top + 1].copy()
+        pmf[:top + w + 1] /= 2.
+
+        top += w
+
+    cdf = np.minimum(np.cumsum(pmf), 1.)
+    cdf.setflags(write=False)
+
+    return cdf
+
+
 def w_critical_value(n, alpha, alternative):
     r"""
     Finds the :math:`W`-statistic critical value given the input parameters.
@@ -11,8 +11,11 @@ Nonparametric Inference Methods
 
     KruskalWallis
     MannWhitney
+    MannWhitneyBatch
+    RankSketch
     SignTest
     WilcoxonTest
+    WilcoxonTestBatch
 
 Other Functions
 ---------------
@@ -49,7 +52,8 @@ import numpy_indexed as npi
 from scipy.stats import beta, chi2, norm, rankdata, t
 from scipy.special import comb
 
-from hypothetical._lib import build_des_mat
+from hypothetical._lib import QuantileSketch, build_design, permutation_test
+from hypothetical.critical import u_distribution, u_exact_p_value, w_exact_p_value
 from hypothetical.summary import var
 
 
@@ -60,10 +64,15 @@ class KruskalWallis(object):
 
     Attributes
     ----------
+    design : Design
+        Compact representation of the data with integer group codes, the table of group labels and
+        the response values.
     design_matrix : array-like
-        Numpy ndarray representing the data matrix for the analysis.
+        Numpy ndarray representing the data matrix for the analysis. Built from :code:`design` when accessed.
+    ranks : array-like
+        The ranks of the sample observations.
     ranked_matrix : array-like
-        Numpy ndarray representing the data matrix with the ranked observations.
+        Numpy ndarray representing the data matrix with the ranked observations. Built when accessed.
     alpha : float
         Alpha level for determining significance.
     n : int
@@ -198,18 +207,18 @@ class KruskalWallis(object):
         if group is not None and len(args) > 1:
             raise ValueError('Only one sample vector should be passed when including a group vector')
 
-        self.design_matrix = build_des_mat(*args, group=group)
+        self.design = build_design(*args, group=group)
 
         if group is not None:
             self.group = group
         else:
-            self.group = self.design_matrix[:, 0]
+            self.group = self.design.group_vector()
 
-        self.ranked_matrix = self._rank()
+        self.ranks = self._rank()
         self.group_rank_sums = self._group_rank_sums()
         self.alpha = alpha
-        self.n = self.design_matrix.shape[0]
-        self.k = len(np.unique(self.design_matrix[:, 0]))
+        self.n = self.design.n
+        self.k = self.design.k
         self.dof = self.k - 1
         self.H = self._h_statistic()
         self.p_value = self._p_value()
@@ -218,6 +227,57 @@ class KruskalWallis(object):
         self.test_description = 'Kruskal-Wallis rank sum test'
         self.test_summary = self._generate_result_summary()
 
+    @property
+    def design_matrix(self):
+        return self.design.to_matrix()
+
+    @property
+    def ranked_matrix(self):
+        return np.column_stack([self.design_matrix, self.ranks])
+
+    def permutation_test(self, n_permutations=9999, batch_size=None, n_jobs=1, random_state=None):
+        r"""
+        Computes the p-value of the :math:`H`-statistic from random permutations of the group labels
+        rather than the chi-square approximation.
+
+        Parameters
+        ----------
+        n_permutations : int, optional
+            Number of random permutations of the group labels. Defaults to 9999.
+        batch_size : int, optional
+            Number of permutations evaluated at once. Defaults to the number that keeps the working memory
+            of a batch near 32 MB.
+        n_jobs : int, optional
+            Number of processes computing batches concurrently. -1 uses all available processors.
+            Defaults to 1.
+        random_state : int, optional
+            Seed of the random permutations.
+
+        Returns
+        -------
+        dict
+            Dictionary containing the :math:`H`-statistic, the permutation p-value and the number of
+            permutations.
+
+        Notes
+        -----
+        The chi-square approximation of the :math:`H`-statistic is poor for small groups. The ranks and the
+        tie correction do not change when the group labels are permuted, so the :math:`H`-statistic of each
+        permutation is found from its group rank sums alone, and those of a whole batch of permutations from
+        one grouped sum of the permuted group codes.
+
+        """
+        n, counts = self.n, self.design.counts
+        correction = tie_correction(self.ranks)
+
+        def h_statistic(sums):
+            return (12. / (n * (n + 1)) * np.sum(sums ** 2 / counts, axis=1) - 3 * (n + 1)) / correction
+
+        h, p = permutation_test(self.design, self.ranks, h_statistic, n_permutations=n_permutations,
+                                batch_size=batch_size, n_jobs=n_jobs, random_state=random_state)
+
+        return {'H-statistic': h, 'p-value': p, 'Permutations': n_permutations}
+
     def _h_statistic(self):
         r"""
         Computes the Kruskal-Wallis :math:`H`-statistic.
@@ -254,9 +314,7 @@ class KruskalWallis(object):
             https://en.wikipedia.org/w/index.php?title=Kruskal%E2%80%93Wallis_one-way_analysis_of_variance&oldid=842351945
 
         """
-        group_observations = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1:], len)
-
-        group_observations = np.array([i for _, i in group_observations])
+        group_observations = self.design.counts
 
         group_summed_ranks = np.array([i for _, i in self.group_rank_sums])
 
@@ -266,7 +324,7 @@ class KruskalWallis(object):
         h = h1 * h2 - (3 * (self.n + 1))
 
         # Apply tie correction
-        h /= tie_correction(self.ranked_matrix[:, 2])
+        h /= tie_correction(self.ranks)
 
         return h
 
@@ -374,20 +432,18 @@ class KruskalWallis(object):
 
     def _rank(self):
 
-        ranks = rankdata(self.design_matrix[:, 1], 'average')
-
-        ranks = np.column_stack([self.design_matrix, ranks])
+        ranks = rankdata(self.design.values[:, 0], 'average')
 
         return ranks
 
     def _group_rank_sums(self):
-        rank_sums = npi.group_by(self.ranked_matrix[:, 0], self.ranked_matrix[:, 2], np.sum)
+        rank_sums = self.design.group_by(self.ranks, np.sum)
 
         return rank_sums
 
     def _mse(self):
-        group_variance = npi.group_by(self.ranked_matrix[:, 0], self.ranked_matrix[:, 2], var)
-        group_n = npi.group_by(self.ranked_matrix[:, 0], self.ranked_matrix[:, 2], len)
+        group_variance = self.design.group_by(self.ranks, var)
+        group_n = self.design.group_by(self.ranks, len)
 
         sse = 0
 
@@ -415,6 +471,9 @@ class MannWhitney(object):
     continuity : bool
         If True, apply the continuity correction of :math:`\frac{1}{2}` to the
         mean rank.
+    exact : bool, optional
+        If True, the p-value is found from the exact null distribution of :math:`U` rather than the normal
+        approximation. Requires samples without ties. Defaults to False.
 
     Attributes
     ----------
@@ -443,6 +502,8 @@ class MannWhitney(object):
         Computed p-value.
     effect_size : float
         Calculated estimated Cohen's effect size.
+    exact : bool
+        If True, the p-value is exact.
 
     Notes
     -----
@@ -525,7 +586,7 @@ class MannWhitney(object):
 
 
     """
-    def __init__(self, y1, y2=None, group=None, continuity=True):
+    def __init__(self, y1, y2=None, group=None, continuity=True, exact=False):
 
         if group is None:
             self.y1 = y1
@@ -543,6 +604,7 @@ class MannWhitney(object):
         self.n = self.n1 + self.n2
 
         self.continuity = continuity
+        self.exact = exact
         self.ranks = self._rank()
         self.u_statistic = self._u()
         self.meanrank = self._mu()
@@ -703,12 +765,24 @@ class MannWhitney(object):
         p : float
             The computed p value.
 
+        Raises
+        ------
+        ValueError
+            If the exact p-value is requested and the samples contain ties.
+
         Notes
         -----
         When sample sizes are large enough (:math:`n > 20`), the distribution of :math:`U` is normally
-        distributed.
+        distributed. For smaller samples, or p-values far into the tails, the exact p-value from the null
+        distribution of :math:`U` given by :code:`u_distribution` should be used instead.
 
         """
+        if self.exact:
+            if len(np.unique(np.concatenate((self.y1, self.y2)))) < self.n:
+                raise ValueError('the exact distribution of U is only defined for samples without ties.')
+
+            return u_exact_p_value(self.u_statistic, self.n1, self.n2)
+
         p = 1 - norm.cdf(self.z_value)
 
         return p * 2
@@ -780,6 +854,404 @@ class MannWhitney(object):
         return ranks
 
 
+class MannWhitneyBatch(object):
+    r"""
+    Performs the Mann-Whitney U test of two independent samples on each of many variables at once.
+
+    Parameters
+    ----------
+    y1 : array-like
+        Two-dimensional array (Numpy ndarray, Pandas DataFrame, list of lists) with one observation of the
+        first sample per row and one variable per column. If :code:`group` is given, the observations of
+        both samples.
+    y2 : array-like, optional
+        Two-dimensional array of the observations of the second sample, with the same number of columns as
+        :code:`y1`.
+    group : array-like, optional
+        One-dimensional array (Numpy ndarray, Pandas Series, list) of the sample membership of the rows of
+        :code:`y1`. Must have exactly two distinct values; the first in sorted order is the first sample.
+    continuity : bool
+        If True, apply the continuity correction of :math:`\frac{1}{2}` to the mean rank.
+    exact : bool, optional
+        If True, the p-values are found from the exact null distribution of :math:`U` rather than the normal
+        approximation. Requires that no variable has tied observations. Defaults to False.
+
+    Attributes
+    ----------
+    n1 : int
+        Number of observations in the first sample.
+    n2 : int
+        Number of observations in the second sample.
+    n : int
+        Total number of observations.
+    u_statistic : numpy ndarray
+        The :math:`U`-statistic of each variable.
+    meanrank : float
+        The mean of :math:`U` under the null hypothesis, including the continuity correction.
+    sigma : numpy ndarray
+        The tie corrected standard deviation of :math:`U` of each variable.
+    z_value : numpy ndarray
+        The standardized :math:`z` value of each variable.
+    p_value : numpy ndarray
+        The p-value of each variable.
+    effect_size : numpy ndarray
+        The estimated Cohen's effect size of each variable.
+    test_summary : dict
+        Dictionary of the test results.
+
+    Raises
+    ------
+    ValueError
+        If :code:`group` does not have exactly two distinct values, or the samples have different numbers
+        of variables.
+    ValueError
+        If exact p-values are requested and a variable has tied observations.
+
+    Notes
+    -----
+    The statistics of each variable are defined as in :code:`MannWhitney`. All the variables are ranked
+    with a single sort along the observations, and the sizes of the groups of tied ranks are found from the
+    same sorted columns, so the tie correction
+
+    .. math::
+
+        \sigma_U = \sqrt{\frac{n_1 n_2 (n + 1)}{12} \left( 1 - \frac{\sum (t_i^3 - t_i)}{n^3 - n} \right)}
+
+    is also computed for all the variables at once. The ties are counted over the observations of both
+    samples, as in :code:`scipy.stats.mannwhitneyu`. :code:`MannWhitney` counts only the ties among the
+    ranks of the first sample, so when a variable has tied observations its :math:`\sigma_U`,
+    :math:`z` and p-value differ from those of :code:`MannWhitney`, while :math:`U` and the mean rank
+    agree. Without ties the two give the same results.
+
+    Examples
+    --------
+    >>> a = [[139750, 1.2], [173200, 3.4], [79750, 2.2], [11500, 0.7], [141500, 5.1]]
+    >>> b = [[103450, 2.5], [124750, 4.4], [137000, 3.9], [89565, 6.0], [102580, 4.8]]
+    >>> mw = MannWhitneyBatch(a, b)
+    >>> mw.u_statistic
+    array([10.,  5.])
+    >>> mw.p_value
+    array([0.5308693 , 0.09469294])
+
+    See Also
+    --------
+    MannWhitney : class for performing the Mann-Whitney U test of a single variable.
+
+    """
+    def __init__(self, y1, y2=None, group=None, continuity=True, exact=False):
+
+        if group is not None:
+            design = build_design(y1, group=group)
+
+            if design.k != 2:
+                raise ValueError('group must have exactly two distinct values.')
+
+            first = design.codes == 0
+            values = np.concatenate([design.values[first], design.values[~first]])
+
+            self.n1 = int(design.counts[0])
+
+        else:
+            y1, y2 = _as_columns(y1), _as_columns(y2)
+
+            if y1.shape[1] != y2.shape[1]:
+                raise ValueError('both samples must have the same number of variables.')
+
+            values = np.concatenate([y1, y2])
+
+            self.n1 = y1.shape[0]
+
+        self.n = values.shape[0]
+        self.n2 = self.n - self.n1
+
+        self.continuity = continuity
+        self.exact = exact
+
+        ranks, ties = _rank_columns(values)
+
+        u1 = self.n1 * self.n2 + (self.n1 * (self.n1 + 1)) / 2. - np.sum(ranks[:self.n1], axis=0)
+        self.u_statistic = np.minimum(u1, self.n1 * self.n2 - u1)
+
+        self.meanrank = (self.n1 * self.n2) / 2. + (0.5 * self.continuity)
+        self.sigma = np.sqrt(((self.n1 * self.n2) * (self.n + 1)) / 12. *
+                             (1 - ties / float(self.n ** 3 - self.n)))
+
+        self.z_value = np.absolute(self.u_statistic - self.meanrank) / self.sigma
+
+        if self.exact:
+            if np.any(ties > 0):
+                raise ValueError('the exact distribution of U is only defined for samples without ties.')
+
+            cdf = u_distribution(self.n1, self.n2)
+            self.p_value = np.minimum(1., 2. * cdf[self.u_statistic.astype(int)])
+        else:
+            self.p_value = 2 * norm.sf(self.z_value)
+
+        self.effect_size = np.abs(self.z_value) / np.sqrt(self.n)
+
+        self.test_summary = {
+            'continuity': self.continuity,
+            'U': self.u_statistic,
+            'mu meanrank': self.meanrank,
+            'sigma': self.sigma,
+            'z-value': self.z_value,
+            'effect size': self.effect_size,
+            'p-value': self.p_value,
+            'test description': 'Mann-Whitney U test'
+        }
+
+
+class RankSketch(object):
+    r"""
+    Mergeable per-group quantile sketches for approximate Mann-Whitney U and Kruskal-Wallis tests of
+    samples too large to rank in memory.
+
+    Parameters
+    ----------
+    k : int, optional
+        Capacity of the largest compactor of each group's :code:`QuantileSketch`. Larger values give more
+        accurate statistics at the cost of about :math:`3k` retained items per group. Defaults to 200.
+    random_state : int or numpy RandomState, optional
+        Seed of the random compactions of the sketches.
+
+    Attributes
+    ----------
+    labels : numpy ndarray
+        The distinct group labels seen so far, in sorted order.
+    sketches : list
+        The :code:`QuantileSketch` of each group, in the order of :code:`labels`.
+    counts : numpy ndarray
+        The number of observations of each group.
+
+    Notes
+    -----
+    The rank statistics are computed from the weighted items of the sketches as if each item of weight
+    :math:`w` were :math:`w` tied observations. If the ranks within the sketches of two samples of sizes
+    :math:`n_1` and :math:`n_2` are off by at most :math:`e_1` and :math:`e_2`, the estimate of :math:`U`
+    is off by at most
+
+    .. math::
+
+        \delta_U = e_1 n_2 + e_2 n_1
+
+    and, as :math:`R_i = n_i (n_i + 1) / 2 + \sum_{j \neq i} U_{ij}`, the rank sum of group :math:`i` is off
+    by at most :math:`\sum_{j \neq i} (e_i n_j + e_j n_i)`. The bounds use the guaranteed
+    :code:`max_rank_error` of each sketch and are propagated to intervals of the test statistic and
+    p-value. The realized error is usually far smaller than the bound. As the standard deviation of
+    :math:`U` grows only as :math:`n^{3/2}` while the error of the sketches grows as :math:`n^2 / k`, the
+    intervals settle the test when the effect is large compared to :math:`1 / k`, and :code:`k` should be
+    raised to resolve smaller effects.
+
+    No tie correction is applied, since ties among the retained items are mostly artifacts of the
+    compaction. The approximation is therefore meant for continuous measurements.
+
+    Examples
+    --------
+    >>> rng = np.random.RandomState(1)
+    >>> shard1, shard2 = RankSketch(random_state=1), RankSketch(random_state=2)
+    >>> shard1.update(rng.normal(size=50000), group=np.repeat(['a', 'b'], 25000))
+    >>> shard2.update(rng.normal(0.02, size=50000), group=np.repeat(['b', 'a'], 25000))
+    >>> mw = shard1.merge(shard2).mann_whitney()
+    >>> mw['U bounds'][0] <= mw['U'] <= mw['U bounds'][1]
+    True
+
+    See Also
+    --------
+    MannWhitney : exact computation of the Mann-Whitney U test.
+    KruskalWallis : exact computation of the Kruskal-Wallis test.
+
+    """
+    def __init__(self, k=200, random_state=None):
+        self.k = k
+        self.labels = None
+        self.sketches = []
+
+        if isinstance(random_state, np.random.RandomState):
+            self._random_state = random_state
+        else:
+            self._random_state = np.random.RandomState(random_state)
+
+    @property
+    def counts(self):
+        return np.array([sketch.n for sketch in self.sketches], dtype=np.intp)
+
+    def update(self, y, group):
+        r"""
+        Adds a chunk of observations to the sketches.
+
+        Parameters
+        ----------
+        y : array-like
+            One-dimensional array of the observations.
+        group : array-like
+            One-dimensional array of the group of each observation.
+
+        """
+        design = build_design(y, group=group)
+
+        for label, values in zip(design.labels, design.split(design.values[:, 0])):
+            self._sketch(label).update(values)
+
+    def merge(self, other):
+        r"""
+        Merges the sketches of another :code:`RankSketch` into this one.
+
+        Parameters
+        ----------
+        other : RankSketch
+            The sketches to merge.
+
+        Returns
+        -------
+        RankSketch
+            The merged sketches, :code:`self`.
+
+        """
+        if other.labels is not None:
+            for label, sketch in zip(other.labels, other.sketches):
+                self._sketch(label).merge(sketch)
+
+        return self
+
+    def mann_whitney(self, continuity=True):
+        r"""
+        Approximates the Mann-Whitney U test of the two groups from their sketches.
+
+        Parameters
+        ----------
+        continuity : bool
+            If True, apply the continuity correction of :math:`\frac{1}{2}` to the mean rank.
+
+        Returns
+        -------
+        dict
+            The estimated test results as in :code:`MannWhitney.test_summary`, with the intervals
+            :code:`'U bounds'` and :code:`'p-value bounds'` implied by the error bounds of the sketches.
+
+        Raises
+        ------
+        ValueError
+            If the sketches do not hold exactly two groups.
+
+        """
+        if self.labels is None or len(self.labels) != 2:
+            raise ValueError('the Mann-Whitney U test requires exactly two groups.')
+
+        (values1, weights1), (values2, weights2) = [sketch.weighted_values() for sketch in self.sketches]
+        n1, n2 = self.counts
+        n = n1 + n2
+
+        less, equal = _weighted_rank_counts(values2, weights2, values1)
+
+        u1 = np.sum(weights1 * (less + equal / 2.))
+        u_error = self.sketches[0].max_rank_error * n2 + self.sketches[1].max_rank_error * n1
+
+        meanrank = (n1 * n2) / 2. + (0.5 * continuity)
+        sigma = np.sqrt(((n1 * n2) * (n + 1)) / 12.)
+
+        # U = min(u1, n1 n2 - u1) increases with u1 up to n1 n2 / 2 and then decreases.
+        u1_bounds = np.clip([u1 - u_error, u1 + u_error], 0, n1 * n2)
+        u_ends = np.minimum(u1_bounds, n1 * n2 - u1_bounds)
+
+        if u1_bounds[0] <= n1 * n2 / 2. <= u1_bounds[1]:
+            u_bounds = (np.min(u_ends), n1 * n2 / 2.)
+        else:
+            u_bounds = (np.min(u_ends), np.max(u_ends))
+
+        u = np.minimum(u1, n1 * n2 - u1)
+
+        z = np.absolute(u - meanrank) / sigma
+        z_bounds = np.absolute(np.array(u_bounds) - meanrank) / sigma
+
+        return {
+            'continuity': continuity,
+            'U': u,
+            'U bounds': u_bounds,
+            'mu meanrank': meanrank,
+            'sigma': sigma,
+            'z-value': z,
+            'effect size': np.abs(z) / np.sqrt(n),
+            'p-value': 2 * norm.sf(z),
+            'p-value bounds': (2 * norm.sf(z_bounds[0]), 2 * norm.sf(z_bounds[1])),
+            'test description': 'Approximate Mann-Whitney U test'
+        }
+
+    def kruskal_wallis(self):
+        r"""
+        Approximates the Kruskal-Wallis test of the groups from their sketches.
+
+        Returns
+        -------
+        dict
+            The estimated :math:`H`-statistic, degrees of freedom and p-value, with the intervals
+            :code:`'H bounds'` and :code:`'p-value bounds'` implied by the error bounds of the sketches.
+
+        Raises
+        ------
+        ValueError
+            If the sketches hold fewer than two groups.
+
+        """
+        if self.labels is None or len(self.labels) < 2:
+            raise ValueError('the Kruskal-Wallis test requires at least two groups.')
+
+        weighted = [sketch.weighted_values() for sketch in self.sketches]
+        counts = self.counts.astype(np.float64)
+        errors = np.array([sketch.max_rank_error for sketch in self.sketches])
+        n = np.sum(counts)
+
+        pooled_values = np.concatenate([v for v, _ in weighted])
+        pooled_weights = np.concatenate([w for _, w in weighted])
+
+        order = np.argsort(pooled_values, kind='mergesort')
+        pooled_values, pooled_weights = pooled_values[order], pooled_weights[order]
+
+        rank_sums = np.zeros(len(weighted))
+
+        for i, (values, weights) in enumerate(weighted):
+            less, equal = _weighted_rank_counts(pooled_values, pooled_weights, values)
+            rank_sums[i] = np.sum(weights * (less + (equal + 1) / 2.))
+
+        rank_sum_errors = errors * (n - counts) + (np.sum(errors * counts) - errors * counts)
+
+        # H in terms of the deviations of the rank sums from their expectations, which the error bounds
+        # apply to directly.
+        deviations = np.absolute(rank_sums - counts * (n + 1) / 2.)
+
+        def h_statistic(d):
+            return 12. / (n * (n + 1)) * np.sum(d ** 2 / counts)
+
+        h = h_statistic(deviations)
+        h_bounds = (h_statistic(np.maximum(deviations - rank_sum_errors, 0.)),
+                    h_statistic(deviations + rank_sum_errors))
+
+        dof = len(counts) - 1
+
+        return {
+            'H-statistic': h,
+            'H bounds': h_bounds,
+            'degrees of freedom': dof,
+            'p-value': chi2.sf(h, dof),
+            'p-value bounds': (chi2.sf(h_bounds[1], dof), chi2.sf(h_bounds[0], dof)),
+            'test description': 'Approximate Kruskal-Wallis rank sum test'
+        }
+
+    def _sketch(self, label):
+        if self.labels is None:
+            self.labels = np.array([label])
+            self.sketches = [QuantileSketch(self.k, self._random_state)]
+
+            return self.sketches[0]
+
+        pos = np.searchsorted(self.labels, label)
+
+        if pos == len(self.labels) or self.labels[pos] != label:
+            self.labels = np.insert(self.labels, pos, label)
+            self.sketches.insert(pos, QuantileSketch(self.k, self._random_state))
+
+        return self.sketches[pos]
+
+
 class MedianTest(object):
     r"""
 
@@ -963,7 +1435,13 @@ class WilcoxonTest(object):
     paired : bool, optional
         If True, performs a paired Wilcoxon Rank Sum test.
     mu : float, optional
-        Optional parameter to specify the value to form the null hypothesis.
+        Optional parameter to specify the value to form the null hypothesis. In a paired test, the median
+        of the differences under the null hypothesis.
+    alternative : str, {'two-sided', 'greater', 'less'}
+        Alternative hypothesis. Defaults to 'two-sided'.
+    exact_threshold : int, optional
+        Largest number of nonzero differences for which the p-value is found from the exact null
+        distribution of :math:`V` rather than the normal approximation. Defaults to 25.
 
     Attributes
     ----------
@@ -973,6 +1451,8 @@ class WilcoxonTest(object):
         Second sample observation vector, if passed. Otherwise, will return None.
     n : int
         Number of sample observations.
+    exact : bool
+        Whether the p-value was found from the exact null distribution of :math:`V`.
     V : float
         Wilcoxon :math:`V`-statistic (also denoted :math:`W` and :math:`U` in some literature).
     z : float
@@ -1010,6 +1490,16 @@ class WilcoxonTest(object):
     When two sample observation vectors are passed into the :code:`wilcoxon_test` function with the parameter
     :code:`paired = False`, the Mann-Whitney U-test is performed.
 
+    Zero differences are dropped and tied differences receive average ranks. If there are at most
+    :code:`exact_threshold` nonzero differences, the p-value is found from the exact null distribution of
+    :math:`V` given by :code:`critical.w_exact_p_value`, which is then that of the observed ranks. Otherwise
+    the p-value is found from the normal approximation. In either case the :math:`z`-score is standardized
+    with the mean :math:`N_r(N_r + 1)/4` and the tie corrected variance
+
+    .. math::
+
+        \sigma_V^2 = \frac{N_r (N_r + 1)(2 N_r + 1)}{24} - \frac{\sum (t_i^3 - t_i)}{48}
+
     Examples
     --------
     The data used in this example is a subset of the professor salary dataset found in Fox and
@@ -1021,8 +1511,8 @@ class WilcoxonTest(object):
     >>> w.test_summary
     {'V': 55.0,
      'effect size': 0.8864052604279182,
-     'p-value': 0.005062032126267768,
-     'test description': 'Wilcoxon signed rank test',
+     'p-value': 0.001953125,
+     'test description': 'Wilcoxon signed rank exact test',
      'z-value': 2.8030595529069404}
 
     References
@@ -1036,7 +1526,7 @@ class WilcoxonTest(object):
         McGraw-Hill. ISBN 07-057348-4
 
     """
-    def __init__(self, y1, y2=None, paired=True, mu=0, alpha=0.05, alternative='two-sided'):
+    def __init__(self, y1, y2=None, paired=True, mu=0, alpha=0.05, alternative='two-sided', exact_threshold=25):
         self.paired = paired
         self.median = mu
         self.alternative = alternative
@@ -1057,10 +1547,22 @@ class WilcoxonTest(object):
 
         self.n = len(self.y1)
 
+        differences = np.asarray(self.y1, dtype=np.float64) - self.median
+
+        # Zero differences carry no sign and are dropped.
+        self.differences = differences[differences != 0]
+        self.ranks = rankdata(np.absolute(self.differences), 'average')
+
+        self.exact = 0 < len(self.differences) <= exact_threshold
+
+        if self.exact:
+            self.test_description = 'Wilcoxon signed rank exact test'
+
         self.V = self._v_statistic()
 
         self.z = self._zvalue()
         self.p = self._pvalue()
+
         self.effect_size = self._eff_size()
         self.test_summary = self._generate_result_summary()
 
@@ -1125,19 +1627,7 @@ class WilcoxonTest(object):
             McGraw-Hill. ISBN 07-057348-4
 
         """
-        if self.paired:
-            y_median_signed = self.y1
-        else:
-            y_median_signed = self.y1 - self.median
-
-        y_median_unsigned = np.absolute(y_median_signed)
-
-        ranks_signed = rankdata(y_median_signed, 'average')
-        ranks_unsigned = rankdata(y_median_unsigned, 'average')
-
-        z = np.where(ranks_signed > 0, 1, 0)
-
-        v = np.sum(np.multiply(ranks_unsigned, z))
+        v = np.sum(self.ranks[self.differences > 0])
 
         return v
 
@@ -1160,13 +1650,15 @@ class WilcoxonTest(object):
 
         .. math::
 
-            z = \frac{V}{\sigma_V}
+            z = \frac{V - N_r (N_r + 1) / 4}{\sigma_V}
 
-        Where :math:`\sigma_V` is the standard deviation of the distribution, which can be computed as:
+        Where :math:`N_r` is the number of nonzero differences and :math:`\sigma_V` is the standard deviation
+        of the distribution, which with :math:`t_i` tied absolute differences in the :math:`i^{th}` group of
+        ties can be computed as:
 
         .. math::
 
-            \sigma_V = \sqrt{\frac{N_r (N_r + 1)(2 N_r + 1)}{6}}
+            \sigma_V = \sqrt{\frac{N_r (N_r + 1)(2 N_r + 1)}{24} - \frac{\sum (t_i^3 - t_i)}{48}}
 
         References
         ----------
@@ -1177,9 +1669,15 @@ class WilcoxonTest(object):
             McGraw-Hill. ISBN 07-057348-4
 
         """
-        sigma_w = np.sqrt((self.n * (self.n + 1) * (2 * self.n + 1)) / 6.)
+        n = len(self.differences)
+
+        _, ties = np.unique(self.ranks, return_counts=True)
+        sigma_w = np.sqrt(n * (n + 1) * (2 * n + 1) / 24. - np.sum(ties ** 3 - ties) / 48.)
 
-        z = self.V / sigma_w
+        if sigma_w == 0:
+            return 0.
+
+        z = (self.V - n * (n + 1) / 4.) / sigma_w
 
         return z
 
@@ -1194,6 +1692,9 @@ class WilcoxonTest(object):
 
         Notes
         -----
+        If there are at most :code:`exact_threshold` nonzero differences, the p-value is found from the exact
+        null distribution of :math:`V` given by :code:`critical.w_exact_p_value`. Otherwise it is found from
+        the normal approximation of the :math:`z`-score.
 
         References
         ----------
@@ -1201,12 +1702,22 @@ class WilcoxonTest(object):
             McGraw-Hill. ISBN 07-057348-4
 
         """
-        p = (1 - norm.cdf(np.abs(self.z)))
+        if self.exact:
+            alternative = 'two-tail' if self.alternative == 'two-sided' else self.alternative
+            tied = len(np.unique(self.ranks)) < len(self.ranks)
+
+            return w_exact_p_value(self.V, len(self.differences), alternative=alternative,
+                                   ranks=self.ranks if tied else None)
+
+        if len(self.differences) == 0:
+            return 1.
 
         if self.alternative == 'two-sided':
-            p *= 2
+            p = 2 * norm.sf(np.abs(self.z))
         elif self.alternative == 'greater':
-            p = 1 - p
+            p = norm.sf(self.z)
+        else:
+            p = norm.cdf(self.z)
 
         if p == 0:
             p = np.finfo(float).eps
@@ -1261,6 +1772,151 @@ class WilcoxonTest(object):
         return test_results
 
 
+class WilcoxonTestBatch(object):
+    r"""
+    Performs the Wilcoxon signed rank test on each column of a matrix of paired differences at once.
+
+    Parameters
+    ----------
+    y1 : array-like
+        Two-dimensional array (Numpy ndarray, Pandas DataFrame, list of lists) with one observation per
+        row and one variable per column. If :code:`y2` is not given, the paired differences.
+    y2 : array-like, optional
+        Two-dimensional array of the matched observations, of the same shape as :code:`y1`. The
+        differences :code:`y1 - y2` are tested.
+    mu : float, optional
+        The median difference under the null hypothesis. Defaults to 0.
+    alternative : str, {'two-sided', 'greater', 'less'}
+        Alternative hypothesis. Defaults to 'two-sided'.
+    exact_threshold : int, optional
+        Largest number of nonzero differences of a column for which the p-value is found from the exact
+        null distribution of :math:`V` rather than the normal approximation. Defaults to 25.
+
+    Attributes
+    ----------
+    n : int
+        Number of observations of each variable.
+    n_nonzero : numpy ndarray
+        Number of nonzero differences of each variable.
+    exact : numpy ndarray
+        Whether the p-value of each variable was found from the exact null distribution of :math:`V`.
+    V : numpy ndarray
+        The sum of the ranks of the positive differences of each variable.
+    z : numpy ndarray
+        The standardized :math:`z`-score of each variable.
+    p : numpy ndarray
+        The p-value of each variable.
+    effect_size : numpy ndarray
+        The estimated effect size of each variable.
+    test_summary : dict
+        Dictionary of the test results.
+
+    Raises
+    ------
+    ValueError
+        If :code:`y1` and :code:`y2` do not have the same shape.
+    ValueError
+        If parameter :code:`alternative` is not one of 'two-sided', 'greater' or 'less'.
+
+    Notes
+    -----
+    The statistics and p-value of each variable are those of :code:`WilcoxonTest` on its column: zero
+    differences are dropped, :math:`V` is the sum of the ranks of the positive differences and the
+    :math:`z`-score is standardized with the tie corrected variance of :math:`V`. The absolute differences
+    of all the variables are ranked with a single sort along the observations. Zero differences are ranked
+    first, so the ranks of the nonzero differences are found by subtracting the number of zeros of their
+    column, and :math:`V` is a masked sum over the columns. Only the exact p-values are computed column by
+    column, from distributions cached per number of nonzero differences.
+
+    Examples
+    --------
+    >>> before = [[1.83, 12.1], [0.50, 10.4], [1.62, 11.7], [2.48, 9.8], [1.68, 10.9],
+    ...           [1.88, 12.6], [1.55, 11.0], [3.06, 10.2], [1.30, 11.4]]
+    >>> after = [[0.878, 11.5], [0.647, 10.9], [0.598, 11.2], [2.05, 10.5], [1.06, 10.1],
+    ...          [1.29, 12.0], [1.06, 11.6], [3.14, 10.0], [1.29, 10.8]]
+    >>> w = WilcoxonTestBatch(before, after)
+    >>> w.V
+    array([40., 29.])
+    >>> w.p
+    array([0.0390625, 0.4765625])
+
+    See Also
+    --------
+    WilcoxonTest : class for performing the Wilcoxon signed rank test of a single variable.
+
+    """
+    def __init__(self, y1, y2=None, mu=0, alternative='two-sided', exact_threshold=25):
+        if alternative not in ('two-sided', 'greater', 'less'):
+            raise ValueError("alternative must be one of 'two-sided', 'greater' or 'less'.")
+
+        differences = _as_columns(y1)
+
+        if y2 is not None:
+            y2 = _as_columns(y2)
+
+            if y2.shape != differences.shape:
+                raise ValueError('samples must have same shape for paired test')
+
+            differences = differences - y2
+
+        differences = differences - mu
+
+        self.alternative = alternative
+        self.test_description = 'Wilcoxon signed rank test'
+
+        self.n = differences.shape[0]
+
+        zeros = np.sum(differences == 0, axis=0)
+        self.n_nonzero = self.n - zeros
+
+        ranks, ties = _rank_columns(np.absolute(differences))
+
+        # The zeros take the lowest ranks of each column; drop them and their group of ties.
+        ranks -= zeros
+        ties -= zeros ** 3 - zeros
+
+        positive = differences > 0
+
+        self.V = np.sum(np.where(positive, ranks, 0.), axis=0)
+
+        n = self.n_nonzero.astype(np.float64)
+        sigma = np.sqrt(n * (n + 1) * (2 * n + 1) / 24. - ties / 48.)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.z = np.where(sigma > 0, (self.V - n * (n + 1) / 4.) / sigma, 0.)
+
+        if alternative == 'two-sided':
+            self.p = 2 * norm.sf(np.absolute(self.z))
+        elif alternative == 'greater':
+            self.p = norm.sf(self.z)
+        else:
+            self.p = norm.cdf(self.z)
+
+        self.p[self.p == 0] = np.finfo(float).eps
+
+        self.exact = (self.n_nonzero > 0) & (self.n_nonzero <= exact_threshold)
+
+        exact_alternative = 'two-tail' if alternative == 'two-sided' else alternative
+
+        for j in np.flatnonzero(self.exact):
+            nonzero_ranks = ranks[differences[:, j] != 0, j]
+
+            self.p[j] = w_exact_p_value(self.V[j], self.n_nonzero[j], alternative=exact_alternative,
+                                        ranks=nonzero_ranks if ties[j] > 0 else None)
+
+        self.p[self.n_nonzero == 0] = 1.
+
+        self.effect_size = np.abs(self.z) / np.sqrt(self.n)
+
+        self.test_summary = {
+            'V': self.V,
+            'z-value': self.z,
+            'p-value': self.p,
+            'effect size': self.effect_size,
+            'test description': self.test_description
+        }
+
+
 def tie_correction(rank_array):
     r"""
     Computes the tie correction factor used in Mann-Whitney and Kruskal-Wallis tests.
@@ -1313,3 +1969,47 @@ def tie_correction(rank_array):
                                                            rank_array.shape[0])
 
     return corr
+
+
+def _as_columns(y):
+    y = np.asarray(y, dtype=np.float64)
+
+    if y.ndim == 1:
+        y = y[:, np.newaxis]
+
+    return y
+
+
+def _weighted_rank_counts(values, weights, x):
+    cumulative = np.concatenate([[0.], np.cumsum(weights)])
+
+    left = cumulative[np.searchsorted(values, x, side='left')]
+    right = cumulative[np.searchsorted(values, x, side='right')]
+
+    return left, right - left
+
+
+def _rank_columns(x):
+    n, p = x.shape
+
+    order = np.argsort(x, axis=0, kind='mergesort')
+    columns = np.arange(p)
+    ordered = x[order, columns]
+
+    # Runs of equal values within each column, numbered in column-major order so runs never span columns.
+    new_run = np.ones((n, p), dtype=bool)
+    new_run[1:] = ordered[1:] != ordered[:-1]
+
+    new_run = new_run.ravel(order='F')
+    run = np.cumsum(new_run) - 1
+
+    run_lengths = np.bincount(run).astype(np.float64)
+    run_starts = np.tile(np.arange(n), p)[new_run]
+
+    ranks = np.empty((n, p))
+    ranks[order, columns] = (run_starts + (run_lengths + 1) / 2.)[run].reshape((n, p), order='F')
+
+    run_columns = np.repeat(columns, n)[new_run]
+    ties = np.bincount(run_columns, weights=run_lengths ** 3 - run_lengths, minlength=p)
+
+    return ranks, ties
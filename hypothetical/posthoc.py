@@ -23,10 +23,9 @@ Post-hoc (no date) Available at: http://www.unt.edu/rss/class/Jon/ISSS_SC/Module
 
 """
 
-from hypothetical._lib import build_des_mat
+from hypothetical._lib import build_design
 import numpy as np
 import pandas as pd
-import numpy_indexed as npi
 from hypothetical.summary import var, std_dev
 from statsmodels.stats.libqsturng import qsturng, psturng
 from itertools import combinations
@@ -115,16 +114,20 @@ class GamesHowell(object):
 
     """
     def __init__(self, *args, group, alpha=0.05):
-        self.design_matrix = build_des_mat(*args, group=group)
+        self.design = build_design(*args, group=group)
 
         if group is not None:
             self.group = group
         else:
-            self.group = self.design_matrix[:, 0]
+            self.group = self.design.group_vector()
 
         self.alpha = alpha
         self.test_result = self._games_howell_test()
 
+    @property
+    def design_matrix(self):
+        return self.design.to_matrix()
+
     def _group_sample_statistics(self):
         r"""
         Computes group summary statistics (mean, number of observations, and variance), for use when
@@ -136,11 +139,13 @@ class GamesHowell(object):
             Dictionary containing each group's mean, number of observations and variance.
 
         """
-        group_means = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1], np.mean)
-        group_obs = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1], len)
-        group_variance = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1], var)
+        y = self.design.values[:, 0]
+
+        group_means = self.design.group_by(y, np.mean)
+        group_obs = self.design.group_by(y, len)
+        group_variance = self.design.group_by(y, var)
 
-        groups = len(np.unique(self.design_matrix[:, 0]))
+        groups = self.design.k
 
         group_stats = {
             'Group Means': group_means,
@@ -152,7 +157,7 @@ class GamesHowell(object):
         return group_stats
 
     def _games_howell_test(self):
-        combs = list(combinations(np.unique(self.group), 2))
+        combs = list(combinations(self.design.labels, 2))
         sample_stats = self._group_sample_statistics()
 
         means_d = dict(sample_stats['Group Means'])
@@ -312,15 +317,15 @@ class TukeysTest(object):
         self.alpha = alpha
         self.test_description = 'Tukey multiple comparisons of means'
 
-        self.design_matrix = build_des_mat(*args, group=group)
+        self.design = build_design(*args, group=group)
 
         if group is not None:
             self.group = group
         else:
-            self.group = self.design_matrix[:, 0]
+            self.group = self.design.group_vector()
 
-        self.n = self.design_matrix.shape[0]
-        self.k = len(np.unique(self.design_matrix[:, 0]))
+        self.n = self.design.n
+        self.k = self.design.k
         self.dof = self.n - self.k
         self.tukey_q_value = self._qvalue()
         self.mse = self._mse()
@@ -328,6 +333,10 @@ class TukeysTest(object):
         self.group_comparison = self._group_comparison()
         self.test_summary = self._generate_results_summary()
 
+    @property
+    def design_matrix(self):
+        return self.design.to_matrix()
+
     def _mse(self):
         r"""
         Calculates the Mean Square Error for use in computing Tukey's HSD.
@@ -347,8 +356,8 @@ class TukeysTest(object):
             MSE = \frac{SE}{(N - k)}
 
         """
-        group_variance = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1], var)
-        group_n = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1], len)
+        group_variance = self.design.group_by(self.design.values[:, 0], var)
+        group_n = self.design.group_by(self.design.values[:, 0], len)
 
         sse = 0
 
@@ -429,17 +438,17 @@ class TukeysTest(object):
             pandas DataFrame of group comparison results.
 
         """
-        group_means = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1], np.mean)
+        group_means = self.design.group_by(self.design.values[:, 0], np.mean)
 
         group_means = [i for _, i in group_means]
 
         group_mean_differences = np.array(list(combinations(group_means, 2)))[:, 0] - \
                                  np.array(list(combinations(group_means, 2)))[:, 1]
 
-        group_sd = npi.group_by(self.design_matrix[:, 0], self.design_matrix[:, 1], std_dev)
+        group_sd = self.design.group_by(self.design.values[:, 0], std_dev)
         group_sd = [i for _, i in group_sd]
 
-        group_names = np.unique(self.design_matrix[:, 0])
+        group_names = self.design.labels
 
         groups = pd.DataFrame(np.array(list(combinations(group_names, 2))))
 
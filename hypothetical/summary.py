@@ -12,6 +12,8 @@ Correlation
 
     pearson
     spearman
+    tiled_correlation
+    correlation_search
 
 Variance and Covariance
 -----------------------
@@ -23,6 +25,16 @@ Variance and Covariance
     var
     std_dev
 
+Streaming Moments
+-----------------
+
+.. autosummary::
+    :toctree: generated/
+
+    MomentAccumulator
+    RollingMoments
+    ExponentialMoments
+
 Other Functions
 ---------------
 
@@ -62,12 +74,19 @@ Weisstein, Eric W. "Covariance Matrix." From MathWorld--A Wolfram Web Resource.
 """
 
 
+import tempfile
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
 from scipy.stats import rankdata
 
+from hypothetical._lib import _bounded_map
 
-def covar(x, y=None, method=None):
+
+def covar(x, y=None, method=None, chunksize=None, nan_policy='propagate'):
     r"""
     Computes the covariance matrix.
 
@@ -75,12 +94,22 @@ def covar(x, y=None, method=None):
     ----------
     x : array-like
         A 2-D array containing the variables and observations to compute the covariance matrix.
+        A :code:`numpy.memmap`, the path to a :code:`.npy` file, or an iterator yielding 2-D blocks
+        of rows are also accepted and are processed block by block without loading the full data.
     y : array-like, optional
         Optional second matrix of same dimensions as x to compute covariance between two separate matrices.
     method : {'naive', 'shifted_covariance', 'two_pass_covariance'}, optional
         Method to compute the covariance matrix. Algorithms include the naive computation, shifted
         covariance and two pass covariance. Of these, the two pass algorithm is the most
         numerically stable and therefore is the default method.
+    chunksize : int, optional
+        Number of rows processed at a time. If given, or if :code:`x` is a memory-mapped array, a
+        :code:`.npy` path or an iterator, the cross-product matrix is accumulated over blocks of rows
+        so that peak memory is roughly one block plus the resulting matrix.
+    nan_policy : {'propagate', 'pairwise'}, optional
+        Defines how missing (NaN) values are handled. 'propagate' (default) returns NaN for any pair of
+        variables containing a missing value. 'pairwise' computes the covariance of each pair of variables
+        from the observations where both are present (pairwise deletion).
 
     Returns
     -------
@@ -158,6 +187,29 @@ def covar(x, y=None, method=None):
         Cov(X, Y) = Cov(X - k_x, Y - k_y) =
         \frac{\sum^n_{i=1}(x_i - k_x)(y_i - k_y) - (\sum^n^{i=1}(x_i - k_x))(\sum^n_{i=1}(y_i - k_y)) / n}{n}
 
+    Each algorithm is evaluated for every pair of variables at once. The data matrix is centered (or
+    shifted) a single time and the sums of products are found with one matrix product :math:`X^T X`,
+    which is symmetric and is computed by the underlying BLAS routine.
+
+    When the data is processed in blocks of rows, the naive and shifted algorithms accumulate the
+    column sums and :math:`X^T X` over the blocks. As the data is only read once, the two pass
+    algorithm is replaced by its single pass equivalent: the centered sums of products of each
+    block are combined with the pairwise updating formulae of (Chan, Golub, & LeVeque, 1982)
+    implemented by :code:`MomentAccumulator`.
+
+    With pairwise deletion, the observation mask :math:`M` (one where a value is present, zero otherwise)
+    and the data :math:`X_0` with missing values set to zero give every pairwise count, sum and sum of
+    products with three matrix products:
+
+    .. math::
+
+        N = M^T M \qquad S = X_0^T M \qquad P = X_0^T X_0
+
+        Cov(X_i, X_j) = \frac{P_{ij} - S_{ij} S_{ji} / N_{ij}}{N_{ij} - 1}
+
+    The data is first shifted by the column means of the present values (two pass), the first present
+    value of each column (shifted) or not at all (naive).
+
     References
     ----------
     Algorithms for calculating variance. (2017, June 24). In Wikipedia, The Free Encyclopedia.
@@ -170,40 +222,54 @@ def covar(x, y=None, method=None):
         http://mathworld.wolfram.com/CovarianceMatrix.html
 
     """
-    x_mat = _build_matrix(x, y)
+    if method not in (None, 'two-pass covariance', 'naive', 'shifted covariance'):
+        raise ValueError("method parameter must be one of 'two-pass covariance' (default), 'naive', "
+                         "'shifted covariance, or None")
+
+    if nan_policy not in ('propagate', 'pairwise'):
+        raise ValueError("nan_policy must be one of 'propagate' (default) or 'pairwise'")
+
+    if nan_policy == 'pairwise':
+        if _is_out_of_core(x) or _is_out_of_core(y) or chunksize is not None:
+            raise ValueError("nan_policy 'pairwise' is not available when processing the data in chunks")
+
+        n, x_sum, xy_sum, _ = _pairwise_sums(_build_matrix(x, y), method)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (xy_sum - x_sum * x_sum.T / n) / (n - 1)
+
+        return cov
+
+    if _is_out_of_core(x) or _is_out_of_core(y):
+        if y is not None:
+            raise ValueError('y cannot be given when x is a memory-mapped array, .npy path or iterator')
+
+        return _chunked_covar(x, method, chunksize)
+
+    if chunksize is not None:
+        return _chunked_covar(_build_matrix(x, y), method, chunksize)
+
+    x_mat = np.asarray(_build_matrix(x, y), dtype=float)
 
     n, m = x_mat.shape
-    cov = np.empty([m, m])
 
     if method is None or method == 'two-pass covariance':
-        for i in np.arange(m):
-            for j in np.arange(m):
-                xx, yy = x_mat[:, i], x_mat[:, j]
-                xbar, ybar = np.mean(xx), np.mean(yy)
-
-                cov[i, j] = (np.sum((xx - xbar) * (yy - ybar))) / (n - 1)
+        xc = x_mat - np.mean(x_mat, axis=0)
+        cov = np.dot(xc.T, xc) / (n - 1)
 
     elif method == 'naive':
-        for i in np.arange(m):
-            for j in np.arange(m):
-                x, y = x_mat[:, i], x_mat[:, j]
-                cov[i, j] = (np.sum(x * y) - np.sum(x) * np.sum(y) / n) / (n - 1)
+        x_sum = np.sum(x_mat, axis=0)
+        cov = (np.dot(x_mat.T, x_mat) - np.outer(x_sum, x_sum) / n) / (n - 1)
 
     elif method == 'shifted covariance':
-        for i in np.arange(m):
-            for j in np.arange(m):
-                xx, yy = x_mat[:, i], x_mat[:, j]
-                kx = ky = xx[0]
-                cov[i, j] = (np.sum((xx - kx) * (yy - ky)) - np.sum(xx - kx) * (np.sum(yy - ky)) / n) / (n - 1)
-
-    else:
-        raise ValueError("method parameter must be one of 'two-pass covariance' (default), 'naive', "
-                         "'shifted covariance, or None")
+        xs = x_mat - x_mat[0]
+        xs_sum = np.sum(xs, axis=0)
+        cov = (np.dot(xs.T, xs) - np.outer(xs_sum, xs_sum) / n) / (n - 1)
 
     return cov
 
 
-def pearson(x, y=None):
+def pearson(x, y=None, chunksize=None, nan_policy='propagate'):
     r"""
     Computes the Pearson product-moment correlation coefficients of the given variables.
 
@@ -212,10 +278,16 @@ def pearson(x, y=None):
     x : array-like
         Numpy ndarray, pandas DataFrame or Series, list, or list of lists representing a 1D or 2D array
         containing the variables and their respective observation vectors. The input is concatenated with
-        the parameter y if given.
+        the parameter y if given. A :code:`numpy.memmap`, the path to a :code:`.npy` file, or an iterator
+        yielding 2-D blocks of rows are also accepted.
     y : array-like, optional
         Numpy ndarray, pandas DataFrame or Series, list, or list of lists representing a 1D or 2D array
         containing the variables and their respective observation vectors.
+    chunksize : int, optional
+        Number of rows processed at a time when accumulating the covariance matrix. See :code:`covar`.
+    nan_policy : {'propagate', 'pairwise'}, optional
+        Defines how missing (NaN) values are handled. If 'pairwise', the correlation of each pair of
+        variables is computed from the observations where both are present. Defaults to 'propagate'.
 
     Returns
     -------
@@ -239,6 +311,10 @@ def pearson(x, y=None):
 
         R_{ij} = \frac{C_{ij}}{\sqrt{C_{ii} * C_{jj}}}
 
+    The full matrix is obtained at once by dividing :math:`C` by the outer product of the standard
+    deviations found on its diagonal. With pairwise deletion, the standard deviations of each variable
+    are instead computed over the observations shared with the other variable of the pair.
+
     Examples
     --------
     >>> h = np.array([[16,4,8,4], [4,10,8,4], [8,8,12,10], [4,4,10,12]])
@@ -269,20 +345,22 @@ def pearson(x, y=None):
         Brigham Young University: John Wiley & Sons, Inc.
 
     """
-    matrix = _build_matrix(x, y)
+    if nan_policy == 'pairwise':
+        if _is_out_of_core(x) or _is_out_of_core(y) or chunksize is not None:
+            raise ValueError("nan_policy 'pairwise' is not available when processing the data in chunks")
 
-    pearson_corr = np.empty((matrix.shape[1], matrix.shape[1]))
+        return _pairwise_pearson(_build_matrix(x, y))
 
-    cov_matrix = covar(matrix)
+    cov_matrix = covar(x, y, chunksize=chunksize, nan_policy=nan_policy)
 
-    for i in np.arange(cov_matrix.shape[0]):
-        for j in np.arange(cov_matrix.shape[0]):
-            pearson_corr[i, j] = cov_matrix[i, j] / np.sqrt(cov_matrix[i, i] * cov_matrix[j, j])
+    sd = np.sqrt(np.diag(cov_matrix))
+
+    pearson_corr = cov_matrix / np.outer(sd, sd)
 
     return pearson_corr
 
 
-def spearman(x, y=None):
+def spearman(x, y=None, chunksize=None, nan_policy='propagate'):
     r"""
     Computes the Spearman correlation coefficients of the given variables.
 
@@ -291,10 +369,17 @@ def spearman(x, y=None):
     x : array-like
         Numpy ndarray, pandas DataFrame or Series, list, or list of lists representing a 1D or 2D array
         containing the variables and their respective observation vectors. The input is concatenated with
-        the parameter y if given.
+        the parameter y if given. A :code:`numpy.memmap`, the path to a :code:`.npy` file, or an iterator
+        yielding 2-D blocks of rows are also accepted.
     y : array-like, optional
         Numpy ndarray, pandas DataFrame or Series, list, or list of lists representing a 1D or 2D array
         containing the variables and their respective observation vectors.
+    chunksize : int, optional
+        Number of rows processed at a time. See :code:`covar`.
+    nan_policy : {'propagate', 'pairwise'}, optional
+        Defines how missing (NaN) values are handled. If 'pairwise', each variable is ranked over its
+        present values and the correlation of each pair is computed from the observations where both
+        are present. Defaults to 'propagate'.
 
     Returns
     -------
@@ -321,6 +406,15 @@ def spearman(x, y=None):
     :math:`cov(rg_X, rg_Y)` is the covariance of the ranked variables and :math:`\sigma_{rg_X}` and
     :math:`\sigma_{rg_Y}` are the standard deviations of the ranked variables.
 
+    All columns of the data matrix are ranked together in a single pass along the observation axis.
+    When the data is processed in blocks, each batch of columns is gathered from the row blocks and
+    ranked in turn, and the ranks are written to a temporary memory-mapped file that is then
+    correlated block by block. Ranking requires every observation of a column, so peak memory is
+    at least one full column rather than one block.
+
+    With pairwise deletion, each column is ranked once over its present values rather than re-ranked
+    for every pair, so the result can differ slightly from re-ranking the complete cases of each pair.
+
     Examples
     --------
     >>> h = np.array([[16,4,8,4], [4,10,8,4], [8,8,12,10], [4,4,10,12]])
@@ -348,19 +442,235 @@ def spearman(x, y=None):
         From https://en.wikipedia.org/w/index.php?title=Spearman%27s_rank_correlation_coefficient&oldid=787350680
 
     """
-    matrix = _build_matrix(x, y)
+    if nan_policy not in ('propagate', 'pairwise'):
+        raise ValueError("nan_policy must be one of 'propagate' (default) or 'pairwise'")
+
+    if nan_policy == 'pairwise':
+        if _is_out_of_core(x) or _is_out_of_core(y) or chunksize is not None:
+            raise ValueError("nan_policy 'pairwise' is not available when processing the data in chunks")
+
+        matrix = np.asarray(_build_matrix(x, y), dtype=float)
+        missing = np.isnan(matrix)
+
+        # Missing values are ranked last so the ranks of the present values are unaffected.
+        rank_matrix = rankdata(np.where(missing, np.inf, matrix), 'average', axis=0)
+        rank_matrix[missing] = np.nan
+
+        return _pairwise_pearson(rank_matrix)
+
+    if _is_out_of_core(x) or _is_out_of_core(y) or chunksize is not None:
+        if y is not None:
+            if _is_out_of_core(x) or _is_out_of_core(y):
+                raise ValueError('y cannot be given when x is a memory-mapped array, .npy path or iterator')
 
-    rank_matrix = matrix.copy()
+            x = _build_matrix(x, y)
 
-    for i in np.arange(rank_matrix.shape[1]):
-        rank_matrix[:, i] = rankdata(matrix[:, i], 'average')
+        with tempfile.TemporaryFile() as rank_file:
+            rank_matrix = _chunked_rank(x, chunksize, rank_file)
+            spearman_corr = pearson(rank_matrix, chunksize=chunksize)
+
+        return spearman_corr
+
+    matrix = _build_matrix(x, y)
+
+    rank_matrix = rankdata(matrix, 'average', axis=0)
 
     spearman_corr = pearson(rank_matrix)
 
     return spearman_corr
 
 
-def var(x, method=None):
+def tiled_correlation(x, method='pearson', block_size=1024, out=None, callback=None, n_jobs=1):
+    r"""
+    Computes the Pearson or Spearman correlation matrix of a wide data matrix tile by tile, writing
+    the tiles to a memory-mapped output or passing them to a callback so the full matrix never has
+    to be held in memory.
+
+    Parameters
+    ----------
+    x : array-like
+        Numpy ndarray, pandas DataFrame or list of lists representing a 2D array with observations
+        as rows and variables as columns.
+    method : {'pearson', 'spearman'}, optional
+        Correlation coefficient to compute. Defaults to 'pearson'.
+    block_size : int, optional
+        Number of variables in each block of the column space. Each tile of the output is at most
+        :code:`block_size` by :code:`block_size`. Defaults to 1024.
+    out : str, numpy ndarray or numpy memmap, optional
+        Where the correlation matrix is written. If a path is given, a :code:`.npy` file is created
+        and returned as a memory-mapped array. If None and no callback is given, an in-memory
+        array is returned.
+    callback : callable, optional
+        Function called as :code:`callback(rows, cols, tile)` for each tile on or above the diagonal,
+        where :code:`rows` and :code:`cols` are slices into the correlation matrix. The tile is
+        discarded after the callback returns.
+    n_jobs : int, optional
+        Number of threads computing tiles concurrently. -1 uses all available processors.
+        Defaults to 1.
+
+    Returns
+    -------
+    numpy ndarray, numpy memmap or None
+        The correlation matrix, or None if only a callback was given.
+
+    Notes
+    -----
+    The columns are centered (and ranked first for Spearman's correlation) and scaled to unit norm
+    once, giving the matrix :math:`Z`. Each tile of the correlation matrix is then a product of two
+    column blocks:
+
+    .. math::
+
+        R_{IJ} = Z_I^T Z_J
+
+    which is the same quantity computed by :code:`pearson` and :code:`spearman`. As the matrix is
+    symmetric, only the tiles on or above the diagonal are computed and the remaining tiles of the
+    output are filled by transposition. The matrix products release the GIL, so tiles computed by
+    a thread pool run in parallel.
+
+    Examples
+    --------
+    >>> h = np.array([[16,4,8,4], [4,10,8,4], [8,8,12,10], [4,4,10,12]])
+    >>> tiled_correlation(h, block_size=2)
+    array([[ 1.        , -0.47140452, -0.24618298, -0.45732956],
+           [-0.47140452,  1.        ,  0.05802589, -0.29643243],
+           [-0.24618298,  0.05802589,  1.        ,  0.80218063],
+           [-0.45732956, -0.29643243,  0.80218063,  1.        ]])
+
+    See Also
+    --------
+    pearson : function for computing the Pearson product-moment correlation of two vectors or a data matrix.
+    spearman : function for computing the Spearman rank correlation of two vectors or a data matrix.
+
+    """
+    z = _standardize_columns(x, method)
+    m = z.shape[1]
+
+    if _is_path(out):
+        out = np.lib.format.open_memmap(out, mode='w+', dtype=z.dtype, shape=(m, m))
+    elif out is None and callback is None:
+        out = np.empty((m, m), dtype=z.dtype)
+
+    for rows, cols, tile in _correlation_tiles(z, block_size, n_jobs):
+        if out is not None:
+            out[rows, cols] = tile
+            out[cols, rows] = tile.T
+
+        if callback is not None:
+            callback(rows, cols, tile)
+
+    if isinstance(out, np.memmap):
+        out.flush()
+
+    return out
+
+
+def correlation_search(x, method='pearson', threshold=None, top_k=None, block_size=1024, n_jobs=1):
+    r"""
+    Finds the pairs of variables with an absolute correlation above a threshold, or the :code:`top_k`
+    most correlated partners of each variable, without forming the full correlation matrix.
+
+    Parameters
+    ----------
+    x : array-like
+        Numpy ndarray, pandas DataFrame or list of lists representing a 2D array with observations
+        as rows and variables as columns.
+    method : {'pearson', 'spearman'}, optional
+        Correlation coefficient to compute. Defaults to 'pearson'.
+    threshold : float, optional
+        Only pairs with :math:`|r| \geq` :code:`threshold` are returned.
+    top_k : int, optional
+        If given, only the :code:`top_k` partners with the largest :math:`|r|` are returned for each
+        variable. Can be combined with :code:`threshold`.
+    block_size : int, optional
+        Number of variables in each block of the column space. Defaults to 1024.
+    n_jobs : int, optional
+        Number of threads computing tiles concurrently. -1 uses all available processors.
+        Defaults to 1.
+
+    Returns
+    -------
+    list of tuple
+        List of :code:`(i, j, r)` tuples giving the column indices of the two variables and their
+        correlation. With a threshold only, each pair is given once with :math:`i < j`, ordered by
+        :math:`i` then :math:`j`. With :code:`top_k`, the partners of each variable :math:`i` are given
+        in order of decreasing :math:`|r|`.
+
+    Raises
+    ------
+    ValueError
+        If neither :code:`threshold` nor :code:`top_k` is given.
+
+    Notes
+    -----
+    The correlation matrix is computed tile by tile as in :code:`tiled_correlation`. Each tile is
+    filtered as soon as it is computed and then discarded, so memory is bounded by one tile plus the
+    number of hits (or :math:`m \times k` running candidates when :code:`top_k` is given) rather than
+    the :math:`m^2` correlation matrix.
+
+    Examples
+    --------
+    >>> h = np.array([[16,4,8,4], [4,10,8,4], [8,8,12,10], [4,4,10,12]])
+    >>> correlation_search(h, threshold=0.45)
+    [(0, 1, -0.4714045207910318), (0, 3, -0.4573295603800236), (2, 3, 0.8021806287494231)]
+    >>> correlation_search(h, top_k=1)
+    [(0, 1, -0.4714045207910318), (1, 0, -0.4714045207910318), (2, 3, 0.8021806287494231), (3, 2, 0.8021806287494231)]
+
+    See Also
+    --------
+    tiled_correlation : function for computing a correlation matrix tile by tile.
+
+    """
+    if threshold is None and top_k is None:
+        raise ValueError('one of threshold or top_k must be given')
+
+    z = _standardize_columns(x, method)
+    m = z.shape[1]
+
+    if top_k is not None:
+        top_k = int(min(top_k, m - 1))
+        best_abs = np.full((m, top_k), -np.inf)
+        best_r = np.full((m, top_k), np.nan)
+        best_idx = np.full((m, top_k), -1, dtype=int)
+
+    hits = []
+
+    for rows, cols, tile in _correlation_tiles(z, block_size, n_jobs):
+        row_idx = np.arange(m)[rows]
+        col_idx = np.arange(m)[cols]
+
+        tile_abs = np.abs(tile)
+        tile_abs[np.isnan(tile_abs)] = -np.inf
+        tile_abs[row_idx[:, np.newaxis] >= col_idx] = -np.inf
+
+        if threshold is not None:
+            tile_abs[tile_abs < threshold] = -np.inf
+
+        if top_k is None:
+            i, j = np.nonzero(tile_abs > -np.inf)
+            hits.extend(zip(row_idx[i].tolist(), col_idx[j].tolist(), tile[i, j].tolist()))
+
+            continue
+
+        _merge_top_k(best_abs, best_r, best_idx, row_idx, tile_abs, tile, col_idx, top_k)
+        _merge_top_k(best_abs, best_r, best_idx, col_idx, tile_abs.T, tile.T, row_idx, top_k)
+
+    if top_k is None:
+        hits.sort()
+
+        return hits
+
+    order = np.argsort(-best_abs, axis=1, kind='stable')
+
+    for i in np.arange(m):
+        for o in order[i]:
+            if best_abs[i, o] > -np.inf:
+                hits.append((int(i), int(best_idx[i, o]), float(best_r[i, o])))
+
+    return hits
+
+
+def var(x, method=None, axis=0):
     r"""
     Front-end interface function for computing the variance of a sample
     or population.
@@ -375,13 +685,17 @@ def var(x, method=None):
         Selects algorithm used to calculate variance. Default method is :code:`corrected_two_pass` which
         is generally more computationally stable than other algorithms (with the exception of youngs-cramer,
         perhaps).
+    axis : int, optional
+        Axis along which the variance is computed. Defaults to 0, the column-wise variance of a
+        two-dimensional input.
 
     Returns
     -------
     v : float or numpy array or numpy structured array or pandas DataFrame
         If the input is one-dimensional, the variance is returned as
         a float. For a two-dimensional input, the variance is calculated
-        column-wise and returned as a numpy array or pandas DataFrame.
+        column-wise (or along :code:`axis`) and returned as a numpy array. Floating point inputs
+        keep their dtype, other inputs are returned as float64.
 
     Examples
     --------
@@ -461,6 +775,10 @@ def var(x, method=None):
         t_j = t_{j-1} + x_j
         S_n = S_{n-1} + \frac{1}{n(n - 1)} (nx_j - t_j)^2
 
+    Every algorithm is computed for all columns at once with whole-array operations. The running
+    sums :math:`t_j` of the Youngs-Cramer algorithm are found with a cumulative sum along the axis, so
+    the updates are the same as in the sequential algorithm without a loop over the observations.
+
     See Also
     --------
     std_dev : function for computing the standard deviation of an observation array.
@@ -483,76 +801,29 @@ def var(x, method=None):
     if xx.ndim > 2:
         raise ValueError('array must be 1D or 2D')
 
-    dim = xx.ndim
-    n = xx.shape[0]
-
-    if method is None or method == 'corrected two pass':
-        if dim == 1:
-            varr = (np.sum(np.power(xx - np.mean(xx), 2)) - (1 / n) *
-                    np.power(np.sum(xx - np.mean(xx)), 2)) / (n - 1)
+    if not np.issubdtype(xx.dtype, np.floating):
+        xx = xx.astype(float)
 
-        else:
-            varr = np.empty(xx.shape[1])
-            j = 0
-            for i in xx.T:
-                varr[j] = (np.sum(np.power(i - np.mean(i), 2)) - (1 / n) *
-                           np.power(np.sum(i - np.mean(i)), 2)) / (n - 1)
+    n = xx.shape[axis]
 
-                j += 1
+    if method is None or method == 'corrected two pass':
+        d = xx - np.mean(xx, axis=axis, keepdims=True)
+        varr = (np.sum(d ** 2, axis=axis) - (1. / n) * np.sum(d, axis=axis) ** 2) / (n - 1)
 
     elif method == 'textbook one pass':
-        if dim == 1:
-            varr = (np.sum(np.power(xx, 2.)) - (1. / n) *
-                    np.power(np.sum(xx), 2.)) / (n - 1)
-
-        else:
-            varr = np.empty(xx.shape[1])
-            j = 0
-            for i in xx.T:
-                varr[j] = (np.sum(np.power(i, 2.)) - (1. / n) * np.power(np.sum(i), 2.)) / (n - 1)
-                j += 1
+        varr = (np.sum(xx ** 2, axis=axis) - (1. / n) * np.sum(xx, axis=axis) ** 2) / (n - 1)
 
     elif method == 'standard two pass':
-        if dim == 1:
-            varr = np.sum(np.power(xx - np.mean(xx), 2)) / (n - 1)
-
-        else:
-            varr = np.empty(xx.shape[1])
-            j = 0
-            for i in xx.T:
-                varr[j] = np.sum(np.power(i - np.mean(i), 2)) / (n - 1)
-                j += 1
+        d = xx - np.mean(xx, axis=axis, keepdims=True)
+        varr = np.sum(d ** 2, axis=axis) / (n - 1)
 
     elif method == 'youngs cramer':
-        if dim == 1:
-            s = 0
-            nn = 1
-            t = xx[0]
-
-            for j in np.arange(1, n):
-                nn += 1
-                t = t + xx[j]
-                s = s + (1. / (nn * (nn - 1)) * np.power(nn * xx[j] - t, 2))
-
-            varr = s / float(n - 1)
-
-        else:
-            varr = np.empty(xx.shape[1])
-            k = 0
-
-            for i in xx.T:
-                s = 0
-                nn = 1
-                t = i[0]
-
-                for j in np.arange(1, n):
-                    nn += 1
-                    t = t + i[j]
-                    s = s + (1. / (nn * (nn - 1))) * np.power(nn * i[j] - t, 2)
+        xa = np.moveaxis(xx, axis, 0)
+        t = np.cumsum(xa, axis=0)
+        j = np.arange(1, n + 1, dtype=xx.dtype).reshape((n,) + (1,) * (xa.ndim - 1))
 
-                s = s / (n - 1.)
-                varr[k] = s
-                k += 1
+        s = np.power(j[1:] * xa[1:] - t[1:], 2) / (j[1:] * (j[1:] - 1))
+        varr = np.sum(s, axis=0) / (n - 1)
 
     else:
         raise ValueError("method parameter must be one of 'corrected two pass' (default), 'textbook one pass', "
@@ -561,7 +832,7 @@ def var(x, method=None):
     return varr
 
 
-def std_dev(x):
+def std_dev(x, axis=0):
     r"""
     Calculates the standard deviation by simply taking the square
     root of the variance.
@@ -571,6 +842,8 @@ def std_dev(x):
     x : array_like
         Numpy ndarray, pandas DataFrame or Series, list, or list of lists representing a 1D or 2D array
         containing the variables and their respective observation vectors.
+    axis : int, optional
+        Axis along which the standard deviation is computed. Defaults to 0.
 
     Returns
     -------
@@ -582,13 +855,13 @@ def std_dev(x):
     var : function for computing the variance of an observation array.
 
     """
-    v = var(x)
+    v = var(x, axis=axis)
     sd = np.sqrt(v)
 
     return sd
 
 
-def variance_condition(x):
+def variance_condition(x, axis=0):
     r"""
     Calculates the condition number, denoted as :math:`\kappa` which
     measures the sensitivity of the variance :math:`S` of a sample
@@ -602,6 +875,8 @@ def variance_condition(x):
     x : array_like
         Numpy ndarray, pandas DataFrame or Series, list, or list of lists representing a 1D or 2D array
         containing the variables and their respective observation vectors.
+    axis : int, optional
+        Axis along which the condition number is computed. Defaults to 0.
 
     Returns
     -------
@@ -635,23 +910,545 @@ def variance_condition(x):
     elif isinstance(x, np.ndarray) is False:
         x = np.array(x)
 
-    if x.ndim == 1:
-        kap_cond = np.linalg.norm(x) / std_dev(x)
-
-    elif x.ndim == 2:
-        kap_cond = np.empty(x.shape[1])
-        j = 0
-        for i in x.T:
-            k = np.linalg.norm(i) / std_dev(i)
-            kap_cond[j] = k
-            j += 1
-
-    else:
+    if x.ndim > 2:
         raise ValueError('array must be 1D or 2D')
 
+    kap_cond = np.linalg.norm(x, axis=axis) / std_dev(x, axis=axis)
+
     return kap_cond
 
 
+class MomentAccumulator(object):
+    r"""
+    Accumulates the count, mean and sum of squared deviations (and optionally the co-moments) of
+    data that arrives in chunks. Partial states computed on separate chunks or processes can be
+    merged with the pairwise updating formulae of Chan, Golub and LeVeque.
+
+    Parameters
+    ----------
+    comoments : bool, optional
+        If True, the matrix of co-moments (sums of cross-products of deviations) is also accumulated
+        so the covariance matrix can be returned. Defaults to False.
+
+    Attributes
+    ----------
+    n : int
+        The number of observations accumulated.
+    mean : float or numpy ndarray
+        The running mean of each variable.
+    m2 : float or numpy ndarray
+        The running sum of squared deviations from the mean of each variable, denoted :math:`S`.
+    comoment : numpy ndarray or None
+        The running matrix of co-moments, :math:`C`, if :code:`comoments` is True. Otherwise None.
+
+    Notes
+    -----
+    Each chunk's count :math:`n_B`, mean :math:`\bar{x}_B` and :math:`S_B` are computed with the
+    standard two pass algorithm. Two partial states :math:`A` and :math:`B` are then combined as given
+    in (Chan, Golub, & LeVeque, 1982):
+
+    .. math::
+
+        n = n_A + n_B \qquad \delta = \bar{x}_B - \bar{x}_A
+
+        \bar{x} = \bar{x}_A + \delta \frac{n_B}{n}
+
+        S = S_A + S_B + \delta^2 \frac{n_A n_B}{n}
+
+    The co-moments are combined in the same way, with :math:`\delta^2` replaced by the outer
+    product :math:`\delta \delta^T`. The Youngs-Cramer updating algorithm used by :code:`var` is the
+    special case of this update where :math:`B` contains a single observation.
+
+    Examples
+    --------
+    >>> f = np.array([[1, -1, 2, 2], [-1, 2, 1, -1], [2, 1, 3, 2], [2, -1, 2, 1]])
+    >>> acc = MomentAccumulator()
+    >>> acc.update(f[:2])
+    >>> acc.update(f[2:])
+    >>> acc.var()
+    array([2.        , 2.25      , 0.66666667, 2.        ])
+
+    Partial states can also be computed separately and merged.
+
+    >>> a, b = MomentAccumulator(comoments=True), MomentAccumulator(comoments=True)
+    >>> a.update(f[:3])
+    >>> b.update(f[3:])
+    >>> a.merge(b).covar()
+    array([[ 2.        , -1.33333333,  1.        ,  1.66666667],
+           [-1.33333333,  2.25      , -0.33333333, -1.33333333],
+           [ 1.        , -0.33333333,  0.66666667,  1.        ],
+           [ 1.66666667, -1.33333333,  1.        ,  2.        ]])
+
+    References
+    ----------
+    Chan, T., Golub, G., & LeVeque, R. (1982). Updating Formulae and a Pairwise Algorithm for
+        Computing Sample Variances. COMPSTAT 1982 5Th Symposium Held At Toulouse 1982, 30-41.
+        http://dx.doi.org/10.1007/978-3-642-51461-6_3
+
+    """
+    def __init__(self, comoments=False):
+        self.comoments = comoments
+        self.n = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.comoment = None
+
+    def update(self, x):
+        r"""
+        Adds a chunk of observations to the accumulated state.
+
+        Parameters
+        ----------
+        x : array-like
+            One-dimensional array of observations of a single variable, or a two-dimensional array
+            with observations as rows and variables as columns.
+
+        """
+        if isinstance(x, pd.DataFrame):
+            x = x.values
+
+        x = np.asarray(x, dtype=float)
+
+        if x.ndim > 2:
+            raise ValueError('array must be 1D or 2D')
+
+        if x.shape[0] == 0:
+            return
+
+        n = x.shape[0]
+        mean = np.mean(x, axis=0)
+        xc = x - mean
+        m2 = np.sum(xc ** 2, axis=0)
+
+        comoment = None
+        if self.comoments:
+            xc2 = xc.reshape(n, -1)
+            comoment = np.dot(xc2.T, xc2)
+
+        self._combine(n, mean, m2, comoment)
+
+    def merge(self, other):
+        r"""
+        Merges the state of another accumulator into this one.
+
+        Parameters
+        ----------
+        other : MomentAccumulator
+            Accumulator holding the moments of a separate set of observations of the same variables.
+
+        Returns
+        -------
+        self : MomentAccumulator
+            The updated accumulator.
+
+        """
+        if self.comoments and other.n > 0 and other.comoment is None:
+            raise ValueError('cannot merge an accumulator without co-moments into one that tracks them')
+
+        if other.n > 0:
+            self._combine(other.n, other.mean, other.m2, other.comoment)
+
+        return self
+
+    def var(self):
+        r"""
+        Returns the sample variance of the accumulated observations.
+
+        Returns
+        -------
+        v : float or numpy ndarray
+            The variance of each variable.
+
+        """
+        return self.m2 / (self.n - 1.)
+
+    def std_dev(self):
+        r"""
+        Returns the sample standard deviation of the accumulated observations.
+
+        Returns
+        -------
+        sd : float or numpy ndarray
+            The standard deviation of each variable.
+
+        """
+        return np.sqrt(self.var())
+
+    def covar(self):
+        r"""
+        Returns the sample covariance matrix of the accumulated observations.
+
+        Returns
+        -------
+        cov : numpy ndarray
+            The covariance matrix.
+
+        """
+        if self.comoment is None:
+            raise ValueError('co-moments are not accumulated, set comoments=True')
+
+        return self.comoment / (self.n - 1.)
+
+    def _combine(self, n_b, mean_b, m2_b, comoment_b):
+        if self.n == 0:
+            self.n, self.mean, self.m2 = n_b, mean_b, m2_b
+
+            if self.comoments:
+                self.comoment = comoment_b
+
+            return
+
+        n_a = self.n
+        n = n_a + n_b
+        delta = mean_b - self.mean
+
+        self.mean = self.mean + delta * (n_b / float(n))
+        self.m2 = self.m2 + m2_b + delta ** 2 * (n_a * n_b / float(n))
+
+        if self.comoments:
+            delta = np.atleast_1d(delta)
+            self.comoment = self.comoment + comoment_b + np.outer(delta, delta) * (n_a * n_b / float(n))
+
+        self.n = n
+
+
+class RollingMoments(object):
+    r"""
+    Maintains the variance (and optionally the covariance matrix) of the most recent :code:`window`
+    observations, updated in constant time as each new observation arrives.
+
+    Parameters
+    ----------
+    window : int
+        The number of most recent observations kept in the window.
+    comoments : bool, optional
+        If True, the co-moments are also maintained so the covariance matrix can be returned.
+        Defaults to False.
+
+    Attributes
+    ----------
+    n : int
+        The number of observations currently in the window.
+    mean : float or numpy ndarray
+        The mean of each variable over the window.
+    m2 : float or numpy ndarray
+        The sum of squared deviations from the mean of each variable over the window, :math:`S`.
+    comoment : numpy ndarray or None
+        The matrix of co-moments over the window if :code:`comoments` is True. Otherwise None.
+
+    Notes
+    -----
+    New observations are added with the Youngs-Cramer update used by :code:`var`:
+
+    .. math::
+
+        t_n = t_{n-1} + x_n
+
+        S_n = S_{n-1} + \frac{1}{n(n - 1)} (nx_n - t_n)^2
+
+    The update does not depend on the order of the observations, so once the window is full the
+    oldest observation :math:`x` is removed by reversing it before :math:`t_n` is reduced:
+
+    .. math::
+
+        S_{n-1} = S_n - \frac{1}{n(n - 1)} (nx - t_n)^2 \qquad t_{n-1} = t_n - x
+
+    The co-moments are updated in the same way with the outer product of :math:`nx - t_n`. Repeated
+    removals can accumulate rounding error over very long streams of data with a large mean.
+
+    Examples
+    --------
+    >>> r = RollingMoments(3)
+    >>> r.update([1, -1, 2, 2])
+    >>> r.var()
+    2.9999999999999996
+
+    """
+    def __init__(self, window, comoments=False):
+        if window < 2:
+            raise ValueError('window must contain at least two observations')
+
+        self.window = window
+        self.comoments = comoments
+        self.n = 0
+        self.m2 = 0.
+        self.comoment = None
+        self._total = 0.
+        self._observations = deque()
+
+    @property
+    def mean(self):
+        if self.n == 0:
+            return np.nan
+
+        return self._total / self.n
+
+    def add(self, x):
+        r"""
+        Adds a single observation to the window, removing the oldest observation if the window is full.
+
+        Parameters
+        ----------
+        x : float or array-like
+            A single observation of one variable, or one-dimensional array of one observation of
+            each variable.
+
+        """
+        # Copied, as the observation is kept in the window and the caller may reuse its buffer.
+        x = np.array(x, dtype=float)
+
+        if self.n == self.window:
+            self._remove(self._observations.popleft())
+
+        self._observations.append(x)
+
+        self.n += 1
+        self._total = self._total + x
+
+        if self.n == 1:
+            self.m2 = np.zeros_like(x)
+
+            if self.comoments:
+                self.comoment = np.zeros((x.size, x.size))
+
+            return
+
+        d = self.n * x - self._total
+        c = 1. / (self.n * (self.n - 1.))
+
+        self.m2 = self.m2 + c * d ** 2
+
+        if self.comoments:
+            d = np.atleast_1d(d)
+            self.comoment = self.comoment + c * np.outer(d, d)
+
+    def update(self, x):
+        r"""
+        Adds a chunk of observations to the window in order.
+
+        Parameters
+        ----------
+        x : array-like
+            One-dimensional array of observations of a single variable, or a two-dimensional array
+            with observations as rows and variables as columns.
+
+        """
+        if isinstance(x, pd.DataFrame):
+            x = x.values
+
+        for obs in np.asarray(x, dtype=float):
+            self.add(obs)
+
+    def var(self):
+        r"""
+        Returns the sample variance of the observations in the window.
+
+        Returns
+        -------
+        v : float or numpy ndarray
+            The variance of each variable.
+
+        """
+        return self.m2 / (self.n - 1.)
+
+    def std_dev(self):
+        r"""
+        Returns the sample standard deviation of the observations in the window.
+
+        Returns
+        -------
+        sd : float or numpy ndarray
+            The standard deviation of each variable.
+
+        """
+        return np.sqrt(self.var())
+
+    def covar(self):
+        r"""
+        Returns the sample covariance matrix of the observations in the window.
+
+        Returns
+        -------
+        cov : numpy ndarray
+            The covariance matrix.
+
+        """
+        if self.comoment is None:
+            raise ValueError('co-moments are not accumulated, set comoments=True')
+
+        return self.comoment / (self.n - 1.)
+
+    def _remove(self, x):
+        if self.n == 1:
+            self.n, self._total, self.m2 = 0, 0., np.zeros_like(x)
+
+            if self.comoments:
+                self.comoment = np.zeros_like(self.comoment)
+
+            return
+
+        d = self.n * x - self._total
+        c = 1. / (self.n * (self.n - 1.))
+
+        self.m2 = self.m2 - c * d ** 2
+
+        if self.comoments:
+            d = np.atleast_1d(d)
+            self.comoment = self.comoment - c * np.outer(d, d)
+
+        self._total = self._total - x
+        self.n -= 1
+
+
+class ExponentialMoments(object):
+    r"""
+    Maintains the exponentially weighted mean and variance (and optionally covariance matrix) of a
+    stream of observations, updated in constant time as each new observation arrives.
+
+    Parameters
+    ----------
+    alpha : float
+        The smoothing factor, :math:`0 < \alpha \leq 1`. Larger values weight recent observations
+        more heavily.
+    comoments : bool, optional
+        If True, the weighted co-moments are also maintained so the covariance matrix can be
+        returned. Defaults to False.
+
+    Attributes
+    ----------
+    n : int
+        The number of observations seen.
+    mean : float or numpy ndarray
+        The exponentially weighted mean of each variable.
+    m2 : float or numpy ndarray
+        The exponentially weighted variance of each variable.
+    comoment : numpy ndarray or None
+        The exponentially weighted covariance matrix if :code:`comoments` is True. Otherwise None.
+
+    Notes
+    -----
+    Each new observation :math:`x` updates the weighted mean :math:`\mu` and variance :math:`S` with
+    the incremental form of the updating algorithms used by :code:`var`, where the weight
+    :math:`1 / n` of the newest observation is replaced by the constant :math:`\alpha`:
+
+    .. math::
+
+        \delta = x - \mu \qquad \mu = \mu + \alpha \delta
+
+        S = (1 - \alpha)(S + \alpha \delta^2)
+
+    The co-moments are updated in the same way with the outer product of :math:`\delta`. The returned
+    variance is the weighted population variance; no bias correction is applied.
+
+    Examples
+    --------
+    >>> e = ExponentialMoments(0.5)
+    >>> e.update([1, -1, 2, 2])
+    >>> e.var()
+    1.0
+
+    """
+    def __init__(self, alpha, comoments=False):
+        if not 0 < alpha <= 1:
+            raise ValueError('alpha must be in the interval (0, 1]')
+
+        self.alpha = alpha
+        self.comoments = comoments
+        self.n = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.comoment = None
+
+    def add(self, x):
+        r"""
+        Adds a single observation.
+
+        Parameters
+        ----------
+        x : float or array-like
+            A single observation of one variable, or one-dimensional array of one observation of
+            each variable.
+
+        """
+        # Copied, as the first observation becomes the mean and the caller may reuse its buffer.
+        x = np.array(x, dtype=float)
+
+        self.n += 1
+
+        if self.n == 1:
+            self.mean, self.m2 = x, np.zeros_like(x)
+
+            if self.comoments:
+                self.comoment = np.zeros((x.size, x.size))
+
+            return
+
+        delta = x - self.mean
+        increment = self.alpha * delta
+
+        self.mean = self.mean + increment
+        self.m2 = (1. - self.alpha) * (self.m2 + delta * increment)
+
+        if self.comoments:
+            self.comoment = (1. - self.alpha) * (self.comoment + np.outer(delta, increment))
+
+    def update(self, x):
+        r"""
+        Adds a chunk of observations in order.
+
+        Parameters
+        ----------
+        x : array-like
+            One-dimensional array of observations of a single variable, or a two-dimensional array
+            with observations as rows and variables as columns.
+
+        """
+        if isinstance(x, pd.DataFrame):
+            x = x.values
+
+        for obs in np.asarray(x, dtype=float):
+            self.add(obs)
+
+    def var(self):
+        r"""
+        Returns the exponentially weighted variance.
+
+        Returns
+        -------
+        v : float or numpy ndarray
+            The weighted variance of each variable.
+
+        """
+        return self.m2
+
+    def std_dev(self):
+        r"""
+        Returns the exponentially weighted standard deviation.
+
+        Returns
+        -------
+        sd : float or numpy ndarray
+            The weighted standard deviation of each variable.
+
+        """
+        return np.sqrt(self.var())
+
+    def covar(self):
+        r"""
+        Returns the exponentially weighted covariance matrix.
+
+        Returns
+        -------
+        cov : numpy ndarray
+            The weighted covariance matrix.
+
+        """
+        if self.comoment is None:
+            raise ValueError('co-moments are not accumulated, set comoments=True')
+
+        return self.comoment
+
+
 def _build_matrix(x, y=None):
     if isinstance(x, pd.DataFrame):
         x = x.values
@@ -667,3 +1464,193 @@ def _build_matrix(x, y=None):
         x = np.column_stack([x, y])
 
     return x
+
+
+def _pairwise_sums(x_mat, method=None):
+    x_mat = np.asarray(x_mat, dtype=float)
+    present = ~np.isnan(x_mat)
+
+    if method is None or method == 'two-pass covariance':
+        shift = np.nanmean(x_mat, axis=0)
+    elif method == 'shifted covariance':
+        shift = x_mat[np.argmax(present, axis=0), np.arange(x_mat.shape[1])]
+    else:
+        shift = 0.
+
+    xs = np.where(present, x_mat - shift, 0.)
+    w = present.astype(float)
+
+    n = np.dot(w.T, w)
+    x_sum = np.dot(xs.T, w)
+    xy_sum = np.dot(xs.T, xs)
+    xx_sum = np.dot((xs ** 2).T, w)
+
+    return n, x_sum, xy_sum, xx_sum
+
+
+def _pairwise_pearson(x_mat):
+    n, x_sum, xy_sum, xx_sum = _pairwise_sums(x_mat)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = xy_sum - x_sum * x_sum.T / n
+        ss = xx_sum - x_sum ** 2 / n
+
+        pearson_corr = cov / np.sqrt(ss * ss.T)
+
+    return pearson_corr
+
+
+def _standardize_columns(x, method='pearson'):
+    x_mat = np.asarray(_build_matrix(x), dtype=float)
+
+    if method == 'spearman':
+        x_mat = rankdata(x_mat, 'average', axis=0)
+    elif method != 'pearson':
+        raise ValueError("method parameter must be one of 'pearson' (default) or 'spearman'")
+
+    xc = x_mat - np.mean(x_mat, axis=0)
+    xc /= np.sqrt(np.sum(xc ** 2, axis=0))
+
+    return xc
+
+
+def _correlation_tiles(z, block_size, n_jobs=1):
+    starts = np.arange(0, z.shape[1], block_size)
+    pairs = [(i, j) for i in starts for j in starts if j >= i]
+
+    def tile(pair):
+        rows, cols = slice(pair[0], pair[0] + block_size), slice(pair[1], pair[1] + block_size)
+
+        return rows, cols, np.dot(z[:, rows].T, z[:, cols])
+
+    # Threads rather than processes, as the tiles share z and the products release the GIL.
+    return _bounded_map(tile, ((pair,) for pair in pairs), n_jobs, executor=ThreadPoolExecutor)
+
+
+def _merge_top_k(best_abs, best_r, best_idx, idx, cand_abs, cand_r, cand_idx, k):
+    all_abs = np.hstack([best_abs[idx], cand_abs])
+    all_r = np.hstack([best_r[idx], cand_r])
+    all_idx = np.hstack([best_idx[idx], np.broadcast_to(cand_idx, cand_abs.shape)])
+
+    keep = np.argpartition(-all_abs, k - 1, axis=1)[:, :k]
+
+    best_abs[idx] = np.take_along_axis(all_abs, keep, axis=1)
+    best_r[idx] = np.take_along_axis(all_r, keep, axis=1)
+    best_idx[idx] = np.take_along_axis(all_idx, keep, axis=1)
+
+
+def _is_path(x):
+    # os.PathLike is not available before Python 3.6.
+    return isinstance(x, str) or hasattr(x, '__fspath__')
+
+
+def _is_out_of_core(x):
+    if isinstance(x, np.ndarray) and not isinstance(x, np.memmap):
+        return False
+
+    return _is_path(x) or isinstance(x, (np.memmap, Iterator))
+
+
+def _row_blocks(x, chunksize=None):
+    if chunksize is None:
+        chunksize = 65536
+
+    if _is_path(x):
+        x = np.load(x, mmap_mode='r')
+
+    if isinstance(x, Iterator):
+        for block in x:
+            if isinstance(block, pd.DataFrame):
+                block = block.values
+
+            yield np.asarray(block, dtype=float)
+
+    else:
+        x = _build_matrix(x)
+
+        for i in np.arange(0, x.shape[0], chunksize):
+            yield np.asarray(x[i:i + chunksize], dtype=float)
+
+
+def _chunked_covar(x, method=None, chunksize=None):
+    if method is None or method == 'two-pass covariance':
+        acc = MomentAccumulator(comoments=True)
+
+        for block in _row_blocks(x, chunksize):
+            acc.update(block)
+
+        if acc.n == 0:
+            raise ValueError('x must contain at least one row')
+
+        return acc.covar()
+
+    n, shift, x_sum, xtx = 0, None, 0., 0.
+
+    for block in _row_blocks(x, chunksize):
+        if method == 'shifted covariance':
+            if shift is None:
+                shift = block[0].copy()
+
+            block = block - shift
+
+        n += block.shape[0]
+        x_sum = x_sum + np.sum(block, axis=0)
+        xtx = xtx + np.dot(block.T, block)
+
+    if n == 0:
+        raise ValueError('x must contain at least one row')
+
+    cov = (xtx - np.outer(x_sum, x_sum) / n) / (n - 1)
+
+    return cov
+
+
+def _chunked_rank(x, chunksize, rank_file):
+    if chunksize is None:
+        chunksize = 65536
+
+    spill_file = None
+
+    if isinstance(x, Iterator):
+        spill_file = tempfile.TemporaryFile()
+        n, m = 0, None
+
+        for block in _row_blocks(x):
+            m = block.shape[1]
+            n += block.shape[0]
+            spill_file.write(np.ascontiguousarray(block).tobytes())
+
+        if n == 0:
+            spill_file.close()
+            raise ValueError('x must contain at least one row')
+
+        spill_file.flush()
+        x = np.memmap(spill_file, dtype=float, mode='r', shape=(n, m))
+
+    elif _is_path(x):
+        x = np.load(x, mmap_mode='r')
+
+    else:
+        x = _build_matrix(x)
+
+    n, m = x.shape
+
+    if n == 0:
+        raise ValueError('x must contain at least one row')
+
+    ranks = np.memmap(rank_file, dtype=float, mode='w+', shape=(n, m))
+
+    # Read as many columns at once as fit in the memory of one block of rows, slicing them directly from
+    # the array or memory map so that only those columns are converted.
+    col_batch = int(max(1, chunksize * m // n))
+
+    for j in np.arange(0, m, col_batch):
+        cols = np.asarray(x[:, j:j + col_batch], dtype=float)
+        ranks[:, j:j + col_batch] = rankdata(cols, 'average', axis=0)
+
+    ranks.flush()
+
+    if spill_file is not None:
+        spill_file.close()
+
+    return ranks
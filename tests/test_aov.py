@@ -1,8 +1,9 @@
 import pytest
-from hypothetical.aov import AnovaOneWay, ManovaOneWay
+from hypothetical.aov import AnovaOneWay, AnovaOneWayBatch, GroupMoments, ManovaOneWay, ManovaOneWayBatch
 import numpy as np
 import pandas as pd
 import os
+from scipy.stats import f_oneway
 
 
 @pytest.fixture
@@ -142,3 +143,310 @@ def test_ManovaOneWay():
     np.testing.assert_almost_equal(wilk["Wilks Lambda p-value"], 0.001210290803741243)
 
     np.testing.assert_almost_equal(hotelling["Hotellings T^2 Statistic"], 2.921368304265692)
+
+
+def test_AnovaOneWay_unbalanced():
+    rng = np.random.RandomState(12)
+    group = rng.randint(0, 40, 500)
+    y = rng.normal(size=500) + group * 0.01
+
+    anov = AnovaOneWay(y, group=group)
+
+    expected = f_oneway(*[y[group == g] for g in np.unique(group)])
+
+    np.testing.assert_almost_equal(anov.f_statistic, expected[0])
+    np.testing.assert_almost_equal(anov.p_value, expected[1])
+
+    for g, n in anov.test_summary['Group Obs Number']:
+        assert n == np.sum(group == g)
+
+
+def test_AnovaOneWayBatch(test_data):
+    rng = np.random.RandomState(3)
+    group = rng.randint(0, 6, 300)
+    y = rng.normal(size=(300, 25)) + (group * 0.05)[:, np.newaxis]
+
+    anov = AnovaOneWayBatch(y, group=group)
+
+    assert anov.f_statistic.shape == (25,)
+    assert anov.group_degrees_of_freedom == 5
+    assert anov.residual_degrees_of_freedom == 294
+
+    for j in range(y.shape[1]):
+        expected = f_oneway(*[y[group == g, j] for g in np.unique(group)])
+
+        np.testing.assert_almost_equal(anov.f_statistic[j], expected[0])
+        np.testing.assert_almost_equal(anov.p_value[j], expected[1])
+
+    plants = AnovaOneWayBatch(test_data[['weight', 'weight']], group=test_data['group'])
+    single = AnovaOneWay(test_data['weight'], group=test_data['group'])
+
+    np.testing.assert_almost_equal(plants.f_statistic, [single.f_statistic] * 2)
+    np.testing.assert_almost_equal(plants.residual_sum_squares, [single.residual_sum_squares] * 2)
+
+
+def test_AnovaOneWay_from_summary():
+    rng = np.random.RandomState(7)
+    group = rng.choice(['a', 'b', 'c', 'd'], 400)
+    y = rng.normal(10, 2, size=400) + (group == 'c')
+
+    anov = AnovaOneWay(y, group=group)
+
+    groups = [y[group == g] for g in anov.group_names]
+    counts = [len(g) for g in groups]
+
+    from_moments = AnovaOneWay.from_summary(counts,
+                                            means=[np.mean(g) for g in groups],
+                                            variances=[np.var(g, ddof=1) for g in groups],
+                                            labels=anov.group_names)
+    from_sums = AnovaOneWay.from_summary(counts,
+                                         sums=[np.sum(g) for g in groups],
+                                         sum_squares=[np.sum(g ** 2) for g in groups],
+                                         labels=anov.group_names)
+
+    for result in (from_moments, from_sums):
+        assert result.design is None
+        assert result.test_summary.keys() == anov.test_summary.keys()
+        assert result.test_summary['Group Obs Number'] == anov.test_summary['Group Obs Number']
+        assert result.residual_degrees_of_freedom == anov.residual_degrees_of_freedom
+
+        np.testing.assert_almost_equal(result.f_statistic, anov.f_statistic)
+        np.testing.assert_almost_equal(result.p_value, anov.p_value)
+        np.testing.assert_almost_equal(result.residual_sum_squares, anov.residual_sum_squares)
+
+    with pytest.raises(ValueError):
+        AnovaOneWay.from_summary(counts, means=[1, 2, 3, 4])
+    with pytest.raises(ValueError):
+        AnovaOneWay.from_summary(counts, means=[1, 2, 3], variances=[1, 1, 1])
+
+
+def test_GroupMoments():
+    rng = np.random.RandomState(8)
+    group = rng.randint(0, 12, 1000)
+    y = rng.normal(1e6, 1, size=1000) + group * 0.1
+
+    anov = AnovaOneWay(y, group=group)
+
+    shards = []
+    for idx in np.array_split(np.arange(1000), 7):
+        state = GroupMoments()
+        for chunk in np.array_split(idx, 3):
+            state.update(y[chunk], group=group[chunk])
+        shards.append(state)
+
+    merged = GroupMoments()
+    for state in shards:
+        merged.merge(state)
+
+    result = merged.anova()
+
+    np.testing.assert_array_equal(merged.labels, anov.group_names)
+    np.testing.assert_array_equal(merged.counts, np.bincount(group))
+    np.testing.assert_allclose(result.f_statistic, anov.f_statistic, rtol=1e-8)
+    np.testing.assert_allclose(result.p_value, anov.p_value, rtol=1e-6)
+    np.testing.assert_allclose(merged.variances, [np.var(y[group == g], ddof=1) for g in range(12)], rtol=1e-8)
+
+
+def test_ManovaOneWay_matrices():
+    rng = np.random.RandomState(14)
+    group = rng.randint(0, 4, 120)
+    y = rng.normal(size=(120, 3)) + group[:, np.newaxis] * 0.2
+
+    maov = ManovaOneWay(*y.T, group=group)
+
+    grand = y.mean(axis=0)
+    h, e = np.zeros((3, 3)), np.zeros((3, 3))
+
+    for g in range(4):
+        yg = y[group == g]
+        d = yg.mean(axis=0) - grand
+        h += len(yg) * np.outer(d, d)
+        e += np.dot((yg - yg.mean(axis=0)).T, yg - yg.mean(axis=0))
+
+    np.testing.assert_allclose(maov.hypothesis_matrix, h, rtol=1e-10, atol=1e-10)
+    np.testing.assert_allclose(maov.error_matrix, e, rtol=1e-10, atol=1e-10)
+    np.testing.assert_allclose(maov.hypothesis_matrix + maov.error_matrix, np.dot((y - grand).T, y - grand),
+                               rtol=1e-10, atol=1e-10)
+
+
+def test_ManovaOneWay_eigenvalues():
+    rng = np.random.RandomState(15)
+    group = rng.randint(0, 3, 90)
+    y = rng.normal(size=(90, 6)) + group[:, np.newaxis] * 0.3
+    y[:, 5] = y[:, 4] * 1e3 + rng.normal(scale=1e-2, size=90)
+
+    maov = ManovaOneWay(*y.T, group=group)
+
+    eigs = np.sort(np.linalg.eigvals(np.linalg.solve(maov.error_matrix, maov.hypothesis_matrix)).real)[::-1]
+    eigs = np.clip(eigs, 0, None)
+
+    pillai = maov.test_summary['Pillai Statistic']['Pillai Statistic']
+    wilks = maov.test_summary['Wilks Lambda']['Wilks Lambda']
+
+    assert np.isrealobj(pillai) and np.isrealobj(wilks)
+
+    np.testing.assert_allclose(pillai, np.sum(eigs / (1 + eigs)), rtol=1e-6)
+    np.testing.assert_allclose(wilks, np.linalg.det(maov.error_matrix) /
+                               np.linalg.det(maov.error_matrix + maov.hypothesis_matrix), rtol=1e-5)
+    np.testing.assert_allclose(maov.roys_statistic['Roys Statistic'], eigs[0], rtol=1e-6)
+    np.testing.assert_allclose(maov.hotelling_t2_statistic['Hotellings T^2 Statistic'], np.sum(eigs), rtol=1e-6)
+
+    with pytest.raises(ValueError):
+        ManovaOneWay(*rng.normal(size=(6, 8)).T, group=[0, 0, 1, 1, 2, 2]).wilks_lambda
+
+
+def test_lazy_statistics():
+    rng = np.random.RandomState(16)
+    group = rng.randint(0, 3, 60)
+    y = rng.normal(size=(60, 2))
+
+    anov = AnovaOneWay(y[:, 0], group=group)
+
+    assert 'test_summary' not in anov.__dict__ and 'p_value' not in anov.__dict__
+
+    p = anov.p_value
+
+    assert anov.__dict__['p_value'] is p
+    assert anov.test_summary is anov.test_summary
+    assert anov.test_summary['p-value'] == p
+
+    maov = ManovaOneWay(*y.T, group=group)
+
+    assert 'pillai_statistic' not in maov.__dict__ and 'test_summary' not in maov.__dict__
+
+    wilks = maov.wilks_lambda
+
+    assert 'pillai_statistic' not in maov.__dict__
+    assert maov.test_summary['Wilks Lambda'] is wilks
+
+
+def test_AnovaOneWay_permutation_test():
+    ctrl, trt1, trt2 = [4.17, 5.58, 5.18], [4.81, 4.17, 4.41], [5.31, 5.12, 5.54]
+
+    anov = AnovaOneWay(ctrl, trt1, trt2)
+
+    result = anov.permutation_test(n_permutations=20000, random_state=5)
+
+    # 306 of the 1680 distinct regroupings have an F statistic at least as large as the observed.
+    np.testing.assert_almost_equal(result['F-statistic'], anov.f_statistic)
+    np.testing.assert_allclose(result['p-value'], 306 / 1680., atol=0.015)
+
+    rng = np.random.RandomState(17)
+    group = rng.randint(0, 4, 200)
+    y = rng.exponential(size=200)
+
+    anov = AnovaOneWay(y, group=group)
+
+    serial = anov.permutation_test(n_permutations=999, batch_size=100, random_state=2)
+    pooled = anov.permutation_test(n_permutations=999, batch_size=100, n_jobs=2, random_state=2)
+
+    assert serial == pooled
+    assert serial['Permutations'] == 999
+
+    summary = AnovaOneWay.from_summary(anov._group_counts, means=anov._group_means,
+                                       variances=anov._group_variances)
+
+    with pytest.raises(ValueError):
+        summary.permutation_test()
+
+
+def test_ManovaOneWayBatch():
+    rng = np.random.RandomState(18)
+    y = rng.normal(size=(150, 4))
+    factors = pd.DataFrame({'a': rng.randint(0, 3, 150),
+                            'b': rng.choice(['x', 'y', 'z', 'w'], 150),
+                            'c': rng.randint(0, 6, 150)})
+    y[:, 0] += factors['a'] * 0.5
+
+    batch = ManovaOneWayBatch(y, factors)
+
+    assert batch.factor_names == ['a', 'b', 'c']
+    np.testing.assert_allclose(batch.total_matrix, np.cov(y.T) * 149)
+
+    for name in batch.factor_names:
+        single = ManovaOneWay(*y.T, group=factors[name])
+        result = batch.results[name]
+
+        np.testing.assert_allclose(result.hypothesis_matrix, single.hypothesis_matrix, atol=1e-10)
+        np.testing.assert_allclose(result.error_matrix, single.error_matrix, atol=1e-10)
+
+        for statistic in ('Pillai Statistic', 'Wilks Lambda', 'Roys Statistic', 'Hotellings T^2'):
+            for key, value in single.test_summary[statistic].items():
+                np.testing.assert_allclose(batch.test_summary[name][statistic][key], value, rtol=1e-8)
+
+        np.testing.assert_allclose(result.group_stats['Group Means'], single.group_stats['Group Means'])
+
+    assert ManovaOneWayBatch(y, factors.values).factor_names == [0, 1, 2]
+
+    with pytest.raises(ValueError):
+        ManovaOneWayBatch(y, {'short': [0, 1] * 10})
+
+
+def test_AnovaOneWay_heteroscedastic(test_data):
+    anov = AnovaOneWay(test_data['weight'], group=test_data['group'])
+
+    # Values from R's oneway.test(weight ~ group, PlantGrowth)
+    welch = anov.welch_statistic
+
+    np.testing.assert_almost_equal(welch['Welch F-value'], 5.180972408113188)
+    np.testing.assert_almost_equal(welch['Denominator DoF'], 17.12841861664413)
+    np.testing.assert_almost_equal(welch['Welch p-value'], 0.01739282149017)
+    assert welch['Numerator DoF'] == 2
+
+    # With equal group sizes the Brown-Forsythe statistic reduces to the ordinary F statistic.
+    brown_forsythe = anov.brown_forsythe_statistic
+
+    np.testing.assert_almost_equal(brown_forsythe['Brown-Forsythe F-value'], anov.f_statistic)
+
+    rng = np.random.RandomState(19)
+    samples = [rng.normal(0, 1, 8), rng.normal(0.5, 3, 25), rng.normal(1, 0.5, 60)]
+
+    anov = AnovaOneWay(*samples)
+
+    n = np.array([len(s) for s in samples])
+    v = np.array([np.var(s, ddof=1) for s in samples])
+    c = (1 - n / n.sum()) * v
+
+    np.testing.assert_almost_equal(anov.brown_forsythe_statistic['Brown-Forsythe F-value'],
+                                   anov.group_sum_squares / c.sum())
+    np.testing.assert_almost_equal(anov.brown_forsythe_statistic['Denominator DoF'],
+                                   c.sum() ** 2 / np.sum(c ** 2 / (n - 1)))
+
+    summary = AnovaOneWay.from_summary(n, means=[np.mean(s) for s in samples], variances=v)
+
+    for key, value in anov.welch_statistic.items():
+        np.testing.assert_almost_equal(summary.welch_statistic[key], value)
+
+
+def test_float32_dtype():
+    rng = np.random.RandomState(20)
+    group = rng.randint(0, 4, 5000)
+    y = rng.normal(50, 5, size=(5000, 6)) + group[:, np.newaxis] * 0.2
+
+    anov64, anov32 = AnovaOneWay(y[:, 0], group=group), AnovaOneWay(y[:, 0], group=group, dtype=np.float32)
+
+    assert anov32.design.values.dtype == np.float32
+    np.testing.assert_allclose(anov32.f_statistic, anov64.f_statistic, rtol=1e-5)
+    np.testing.assert_allclose(anov32.welch_statistic['Welch F-value'],
+                               anov64.welch_statistic['Welch F-value'], rtol=1e-5)
+
+    batch64, batch32 = AnovaOneWayBatch(y, group), AnovaOneWayBatch(y, group, dtype=np.float32)
+
+    np.testing.assert_allclose(batch32.f_statistic, batch64.f_statistic, rtol=1e-5)
+
+    maov64, maov32 = ManovaOneWay(*y.T, group=group), ManovaOneWay(*y.T, group=group, dtype=np.float32)
+
+    assert maov32.design.values.dtype == np.float32
+    assert maov32.error_matrix.dtype == np.float64
+    np.testing.assert_allclose(maov32.error_matrix, maov64.error_matrix,
+                               atol=1e-5 * np.max(np.abs(maov64.error_matrix)))
+    np.testing.assert_allclose(maov32.wilks_lambda['Wilks Lambda'], maov64.wilks_lambda['Wilks Lambda'],
+                               rtol=1e-5)
+
+    factors32 = ManovaOneWayBatch(y, {'g': group}, dtype=np.float32)
+
+    np.testing.assert_allclose(factors32.results['g'].pillai_statistic['Pillai Statistic'],
+                               maov64.pillai_statistic['Pillai Statistic'], rtol=1e-5)
+
+    with pytest.raises(ValueError):
+        AnovaOneWay(y[:, 0], group=group, dtype=np.int32)
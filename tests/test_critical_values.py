@@ -42,6 +42,63 @@ def test_u_critical_value():
         c.u_critical_value(10, 8, 0.05)
 
 
+def test_u_exact():
+    np.testing.assert_allclose(c.u_distribution(3, 3), [0.05, 0.1, 0.2, 0.35, 0.5])
+    np.testing.assert_allclose(c.u_distribution(4, 7), c.u_distribution(7, 4))
+
+    # p-values from the exact distribution in scipy.stats.mannwhitneyu
+    np.testing.assert_almost_equal(c.u_exact_p_value(72, 12, 17), 0.19471837245055898)
+    np.testing.assert_allclose(c.u_exact_p_value(5995, 150, 130), 1.647645485923303e-08, rtol=1e-8)
+    np.testing.assert_allclose(c.u_exact_p_value(150 * 130 - 5995, 150, 130, 'one-tail'),
+                               1.647645485923303e-08 / 2, rtol=1e-8)
+
+    assert c.u_exact_critical_value(10, 11, 0.05) == c.u_critical_value(10, 11, 0.05)
+    assert c.u_exact_critical_value(8, 8, 0.10) == c.u_critical_value(8, 8, 0.10)
+    assert c.u_exact_critical_value(8, 8, 0.05, 'two-tail') == c.u_exact_critical_value(8, 8, 0.025)
+    assert np.isnan(c.u_exact_critical_value(2, 2, 0.05))
+
+    crit = c.u_exact_critical_value(200, 240, 0.001)
+    cdf = c.u_distribution(200, 240)
+
+    assert cdf[crit] <= 0.001 < cdf[crit + 1]
+
+    with pytest.raises(ValueError):
+        c.u_exact_critical_value(10, 10, 1.5)
+    with pytest.raises(ValueError):
+        c.u_exact_p_value(10, 5, 5, 'three-tail')
+    with pytest.raises(ValueError):
+        c.u_distribution(2000, 2000)
+
+
+def test_w_exact():
+    np.testing.assert_allclose(c.w_distribution(3), [0.125, 0.25, 0.375, 0.625, 0.75, 0.875, 1.])
+
+    # p-values from the exact distribution in scipy.stats.wilcoxon
+    np.testing.assert_almost_equal(c.w_exact_p_value(40, 9), 0.0390625)
+    np.testing.assert_almost_equal(c.w_exact_p_value(40, 9, 'greater'), 0.01953125)
+    np.testing.assert_almost_equal(c.w_exact_p_value(40, 9, 'less'), 0.986328125)
+
+    # The extreme tails of a large sample have probability 2^-60 each
+    np.testing.assert_allclose(c.w_exact_p_value(1830, 60), 2. ** -59, rtol=1e-10)
+    np.testing.assert_allclose(c.w_exact_p_value(1830, 60, 'greater'), 2. ** -60, rtol=1e-10)
+    np.testing.assert_allclose(c.w_exact_p_value(0, 60), c.w_exact_p_value(1830, 60), rtol=1e-10)
+
+    ranks = np.array([1.5, 1.5, 3, 5, 5, 5, 7, 8])
+    signs = (np.arange(2 ** 8)[:, np.newaxis] >> np.arange(8)) & 1
+    null = signs.dot(ranks)
+
+    for v in (4.5, 16, 30):
+        p = 2 * min(np.mean(null <= v), np.mean(null >= v))
+        np.testing.assert_almost_equal(c.w_exact_p_value(v, 8, ranks=ranks), min(p, 1.))
+
+    with pytest.raises(ValueError):
+        c.w_exact_p_value(10, 5, 'two-sided')
+    with pytest.raises(ValueError):
+        c.w_exact_p_value(10, 3, ranks=[1.25, 1.75, 3])
+    with pytest.raises(ValueError):
+        c.w_distribution(0)
+
+
 def test_w_critical_value():
     n, alpha, alternative = 15, 0.05, 'two-tail'
 
@@ -1,7 +1,7 @@
 import pytest
 import numpy as np
 import pandas as pd
-from hypothetical._lib import build_des_mat
+from hypothetical._lib import build_des_mat, build_design
 
 
 @pytest.fixture
@@ -82,3 +82,32 @@ def test_build_design_matrix():
 
     assert isinstance(des_mat, np.ndarray)
     assert des_mat_group_df.shape == dat.shape
+
+
+def test_build_design(test_array):
+    dat = test_array
+
+    design = build_design(dat[:, 1], dat[:, 2], dat[:, 3], dat[:, 4], group=dat[:, 0])
+
+    assert design.codes.dtype == np.intp
+    assert design.values.dtype == np.float64
+    assert design.values.flags['C_CONTIGUOUS']
+    assert design.values.shape == (dat.shape[0], 4)
+    assert design.k == 6
+    np.testing.assert_array_equal(design.labels, np.arange(1., 7.))
+    np.testing.assert_array_equal(design.counts, np.repeat(8, 6))
+    np.testing.assert_array_equal(design.to_matrix(), build_des_mat(dat[:, 1], dat[:, 2], dat[:, 3], dat[:, 4],
+                                                                    group=dat[:, 0]))
+
+    group = np.where(dat[:, 0] > 3, 'b', 'a')
+    design_str = build_design(pd.Series(dat[:, 1]), group=pd.Series(group), dtype=np.float32)
+
+    assert design_str.values.dtype == np.float32
+    np.testing.assert_array_equal(design_str.labels, ['a', 'b'])
+    np.testing.assert_allclose([v for _, v in design_str.group_by(design_str.values[:, 0], np.sum)],
+                               [dat[:24, 1].sum(), dat[24:, 1].sum()], rtol=1e-6)
+
+    design_samples = build_design(dat[:10, 1], dat[10:14, 2])
+
+    np.testing.assert_array_equal(design_samples.counts, [10, 4])
+    np.testing.assert_array_equal(design_samples.split()[1][:, 0], dat[10:14, 2])
@@ -1,10 +1,11 @@
 import pytest
 
-from hypothetical.nonparametric import MannWhitney, WilcoxonTest, tie_correction, KruskalWallis
+from hypothetical.nonparametric import MannWhitney, MannWhitneyBatch, RankSketch, WilcoxonTest, WilcoxonTestBatch, \
+    tie_correction, KruskalWallis
 import pandas as pd
 import numpy as np
 import os
-from scipy.stats import rankdata, tiecorrect
+from scipy.stats import norm, rankdata, tiecorrect
 
 
 @pytest.fixture
@@ -115,8 +116,112 @@ def test_MannWhitney(test_data):
         MannWhitney(y1=mult_data[:, 1], group=mult_data[:, 0])
 
 
-def test_wilcox_test(test_data):
-    mult_data = multivariate_test_data()
+def test_MannWhitney_exact():
+    x = [-0.052, -0.111, 1.042, -1.257, 0.745, -1.711, -0.206, -0.235, 1.128, -0.013, -0.613, 1.374]
+    y = [2.411, 0.111, 1.492, 0.352, 0.962, 1.057, -0.475, 0.864, -0.262, -0.189, 0.342, -1.184, -0.676,
+         1.032, 1.444, 1.652, 0.336]
+
+    mw = MannWhitney(x, y, exact=True)
+
+    assert mw.u_statistic == 72
+    np.testing.assert_almost_equal(mw.p_value, 0.19471837245055898)
+    assert mw.test_summary['p-value'] == mw.p_value
+
+    with pytest.raises(ValueError):
+        MannWhitney([1, 2, 3, 4], [3, 5, 6, 7], exact=True)
+
+
+def test_MannWhitneyBatch():
+    rng = np.random.RandomState(21)
+    y1, y2 = rng.randn(12, 4), rng.randn(17, 4) + 0.5
+
+    mw = MannWhitneyBatch(y1, y2)
+
+    for j in range(4):
+        single = MannWhitney(y1[:, j], y2[:, j])
+
+        np.testing.assert_almost_equal(mw.u_statistic[j], single.u_statistic)
+        np.testing.assert_almost_equal(mw.z_value[j], single.z_value)
+        np.testing.assert_almost_equal(mw.p_value[j], single.p_value)
+        np.testing.assert_almost_equal(mw.effect_size[j], single.effect_size)
+
+    mw_exact = MannWhitneyBatch(y1, y2, exact=True)
+
+    for j in range(4):
+        np.testing.assert_almost_equal(mw_exact.p_value[j], MannWhitney(y1[:, j], y2[:, j], exact=True).p_value)
+
+    x = rng.randint(0, 8, (40, 3))
+    g = np.repeat(['b', 'a'], [25, 15])
+
+    mw_group = MannWhitneyBatch(x, group=g, continuity=False)
+
+    assert mw_group.n1 == 15
+    for j in range(3):
+        a, b = x[g == 'a', j], x[g == 'b', j]
+        ranks = rankdata(np.concatenate([a, b]))
+        u1 = 15 * 25 + 15 * 16 / 2. - ranks[:15].sum()
+        sigma = np.sqrt(15 * 25 * 41 / 12. * tiecorrect(ranks))
+
+        np.testing.assert_almost_equal(mw_group.u_statistic[j], min(u1, 15 * 25 - u1))
+        np.testing.assert_almost_equal(mw_group.sigma[j], sigma)
+
+    # With ties, U agrees with MannWhitney, but the tie correction is taken over both samples
+    tied1, tied2 = rng.randint(0, 5, (30, 3)), rng.randint(1, 6, (35, 3))
+    mw_tied = MannWhitneyBatch(tied1, tied2, continuity=False)
+
+    for j in range(3):
+        single = MannWhitney(tied1[:, j], tied2[:, j], continuity=False)
+        ranks = rankdata(np.concatenate([tied1[:, j], tied2[:, j]]))
+        sigma = np.sqrt(30 * 35 * 66 / 12. * tiecorrect(ranks))
+        z = np.absolute(single.u_statistic - 30 * 35 / 2.) / sigma
+
+        np.testing.assert_almost_equal(mw_tied.u_statistic[j], single.u_statistic)
+        np.testing.assert_almost_equal(mw_tied.meanrank, single.meanrank)
+        np.testing.assert_almost_equal(mw_tied.sigma[j], sigma)
+        np.testing.assert_almost_equal(mw_tied.p_value[j], 2 * norm.sf(z))
+        assert not np.isclose(mw_tied.sigma[j], single.sigma)
+
+    with pytest.raises(ValueError):
+        MannWhitneyBatch(x, group=np.repeat(['a', 'b', 'c'], [10, 10, 20]))
+
+    with pytest.raises(ValueError):
+        MannWhitneyBatch(x[:25], x[25:], exact=True)
+
+
+def test_RankSketch():
+    rng = np.random.RandomState(23)
+    x, g = rng.randn(150), np.repeat(['a', 'b', 'c'], [40, 50, 60])
+
+    sketch = RankSketch(random_state=1)
+    sketch.update(x, group=g)
+
+    kw, kw_exact = sketch.kruskal_wallis(), KruskalWallis(x, group=g)
+
+    np.testing.assert_almost_equal(kw['H-statistic'], kw_exact.H)
+    np.testing.assert_almost_equal(kw['p-value'], kw_exact.p_value)
+    np.testing.assert_almost_equal(kw['H bounds'], (kw_exact.H, kw_exact.H))
+
+    with pytest.raises(ValueError):
+        sketch.mann_whitney()
+
+    shard1, shard2 = RankSketch(k=100, random_state=2), RankSketch(k=100, random_state=3)
+    y1, y2 = rng.randn(20000), rng.randn(20000) + 0.05
+
+    for i in range(0, 20000, 2500):
+        shard1.update(np.concatenate([y1[i:i + 2500], y2[i:i + 2500]]), group=np.repeat([1, 2], 2500))
+
+    shard2.update(y1[:100] + 10, group=np.ones(100))
+
+    mw = shard1.merge(shard2).mann_whitney()
+    mw_exact = MannWhitney(np.concatenate([y1, y1[:100] + 10]), y2)
+
+    assert mw['U bounds'][0] <= mw_exact.u_statistic <= mw['U bounds'][1]
+    assert mw['p-value bounds'][0] <= mw_exact.p_value <= mw['p-value bounds'][1]
+    assert np.sum(shard1.counts) == 40100
+
+
+def test_wilcox_test(test_data, multivariate_test_data):
+    mult_data = multivariate_test_data
 
     sal_a = test_data.loc[test_data['discipline'] == 'A']['salary']
     sal_b = test_data.loc[test_data['discipline'] == 'B']['salary']
@@ -127,22 +232,126 @@ def test_wilcox_test(test_data):
 
     np.testing.assert_equal(test_result['V'], 16471.0)
     np.testing.assert_almost_equal(test_result['p-value'], np.finfo(float).eps)
-    np.testing.assert_almost_equal(test_result['z-value'], 11.667217617844829)
+    np.testing.assert_almost_equal(test_result['z-value'], 11.667254206295619)
 
     with pytest.raises(ValueError):
         WilcoxonTest(sal_a, sal_b, paired=True)
 
+    # V is the sum of the ranks of the positive differences, here none, and z takes the sign of V - E(V),
+    # as in scipy.stats.wilcoxon
     paired_w = WilcoxonTest(mult_data[:, 1], mult_data[:, 2], paired=True)
 
     paired_result = paired_w.test_summary
 
-    np.testing.assert_equal(paired_result['V'], 1176.0)
-    np.testing.assert_almost_equal(paired_result['p-value'], 1.6310099937300038e-09)
-    np.testing.assert_almost_equal(paired_result['z-value'], 6.030848532388999)
+    np.testing.assert_equal(paired_result['V'], 0.0)
+    np.testing.assert_almost_equal(paired_result['p-value'], 1.6310100430962223e-09)
+    np.testing.assert_almost_equal(paired_result['z-value'], -6.030848532388999)
 
     assert paired_result['test description'] == 'Wilcoxon signed rank test'
 
 
+def test_wilcox_test_exact():
+    x = [1.83, 0.50, 1.62, 2.48, 1.68, 1.88, 1.55, 3.06, 1.30]
+    y = [0.878, 0.647, 0.598, 2.05, 1.06, 1.29, 1.06, 3.14, 1.29]
+
+    w = WilcoxonTest(x, y)
+
+    assert w.exact
+    assert w.V == 40
+    np.testing.assert_almost_equal(w.p, 0.0390625)
+    np.testing.assert_almost_equal(WilcoxonTest(x, y, alternative='greater').p, 0.01953125)
+
+    d = np.array([0.5, -0.5, 0., 1.2, 2.1, -0.3, 1.2, 0., 0.8, 1.7])
+    w = WilcoxonTest(d)
+
+    nonzero = d[d != 0]
+    ranks = rankdata(np.absolute(nonzero))
+    signs = (np.arange(2 ** 8)[:, np.newaxis] >> np.arange(8)) & 1
+    null = signs.dot(ranks)
+
+    assert w.V == np.sum(ranks[nonzero > 0])
+    np.testing.assert_almost_equal(w.p, 2 * min(np.mean(null <= w.V), np.mean(null >= w.V)))
+
+    assert not WilcoxonTest(x, y, exact_threshold=5).exact
+
+
+def test_wilcox_test_normal_approximation():
+    d = [-1, 1, -1, 4, -5, 0, 8, 2, 3, 4, 1, 2, 3, 4, -2, 1, 0, 2, 0, -3,
+         2, 1, 1, 5, 4, 2, 6, 0, -3, 5, 1, 0, -2, 0, -3, 2, -3, -1, 1, -1]
+
+    # p-values and z-scores from scipy.stats.wilcoxon without continuity correction
+    expected = {'two-sided': 0.036550219284855585, 'greater': 0.018275109642427793, 'less': 0.9817248903575722}
+
+    for alternative, p in expected.items():
+        w = WilcoxonTest(d, alternative=alternative)
+
+        assert not w.exact
+        assert w.V == 419
+        np.testing.assert_almost_equal(w.z, 2.090752910534602)
+        np.testing.assert_almost_equal(w.p, p)
+
+
+def test_wilcox_test_batch():
+    rng = np.random.RandomState(25)
+
+    d = np.round(rng.randn(20, 12), 1) + 0.2
+    d[:3, 4] = 0
+    d[:, 7] = 0
+
+    w = WilcoxonTestBatch(d)
+
+    for j in range(12):
+        if j == 7:
+            continue
+
+        single = WilcoxonTest(d[:, j])
+
+        np.testing.assert_almost_equal(w.V[j], single.V)
+        np.testing.assert_almost_equal(w.z[j], single.z)
+        np.testing.assert_almost_equal(w.p[j], single.p)
+        np.testing.assert_almost_equal(w.effect_size[j], single.effect_size)
+
+    np.testing.assert_equal(w.n_nonzero, np.sum(d != 0, axis=0))
+    assert w.p[7] == 1
+
+    # More than 25 nonzero differences, with ties, zeros and a column of only zeros
+    y1 = np.round(rng.randn(60, 5) * 3)
+    y2 = np.round(rng.randn(60, 5))
+    y1[:20, 1] = y2[:20, 1]
+    y1[:, 4] = y2[:, 4]
+
+    for alternative, mu in (('two-sided', 0), ('greater', 0), ('less', 0), ('two-sided', 1), ('less', -2.5)):
+        w = WilcoxonTestBatch(y1, y2, mu=mu, alternative=alternative)
+
+        assert not np.any(w.exact)
+        for j in range(5):
+            single = WilcoxonTest(y1[:, j], y2[:, j], mu=mu, alternative=alternative)
+
+            np.testing.assert_almost_equal(w.V[j], single.V)
+            np.testing.assert_almost_equal(w.z[j], single.z)
+            np.testing.assert_almost_equal(w.p[j], single.p)
+            np.testing.assert_almost_equal(w.effect_size[j], single.effect_size)
+
+    # p-values from scipy.stats.wilcoxon without continuity correction
+    d = [-1, 1, -1, 4, -5, 0, 8, 2, 3, 4, 1, 2, 3, 4, -2, 1, 0, 2, 0, -3,
+         2, 1, 1, 5, 4, 2, 6, 0, -3, 5, 1, 0, -2, 0, -3, 2, -3, -1, 1, -1]
+
+    w = WilcoxonTestBatch(np.column_stack([d, np.negative(d)]))
+
+    np.testing.assert_almost_equal(w.V, [419, 176])
+    np.testing.assert_almost_equal(w.p, [0.036550219284855585, 0.036550219284855585])
+
+    w = WilcoxonTestBatch(d, mu=1, alternative='greater')
+
+    np.testing.assert_almost_equal(w.V, [275])
+    np.testing.assert_almost_equal(w.p, [0.5394502650717261])
+
+    with pytest.raises(ValueError):
+        WilcoxonTestBatch(y1, y2[:50])
+    with pytest.raises(ValueError):
+        WilcoxonTestBatch(y1, alternative='two-tail')
+
+
 def test_kruskal_wallis():
     data = plants_test_data()
 
@@ -185,6 +394,21 @@ def test_kruskal_wallis():
         KruskalWallis(data['weight'], data['weight'], group=data['group'])
 
 
+def test_kruskal_wallis_permutation_test(plants_test_data):
+    kw = KruskalWallis(plants_test_data['weight'], group=plants_test_data['group'])
+
+    result = kw.permutation_test(n_permutations=4999, random_state=3)
+
+    np.testing.assert_almost_equal(result['H-statistic'], kw.H)
+    np.testing.assert_allclose(result['p-value'], 0.0144, atol=0.005)
+
+    small = KruskalWallis([1.2, 3.1, 2.2], [2.9, 4.8, 5.3], [0.7, 1.9, 3.3])
+    permuted = small.permutation_test(n_permutations=999, random_state=4)
+
+    assert 0 < permuted['p-value'] <= 1
+    assert permuted == small.permutation_test(n_permutations=999, random_state=4)
+
+
 def test_tie_correction():
     mult_data = multivariate_test_data()
 
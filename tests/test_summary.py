@@ -1,7 +1,8 @@
 import pytest
 import numpy as np
 import pandas as pd
-from hypothetical.summary import covar, pearson, spearman, var, std_dev, variance_condition
+from hypothetical.summary import covar, pearson, spearman, var, std_dev, variance_condition, MomentAccumulator, \
+    tiled_correlation, correlation_search, RollingMoments, ExponentialMoments
 from scipy.stats import spearmanr
 from numpy.core.multiarray import array
 
@@ -78,6 +79,109 @@ class TestCorrelationCovariance(object):
         np.testing.assert_allclose(covar(self.d[:, 1:3], self.d[:, 3:], 'two-pass covariance'),
                                    np.cov(self.d[:, 1:], rowvar=False))
 
+    def test_covariance_integer_input(self):
+        h = [[16, 4, 8, 4], [4, 10, 8, 4], [8, 8, 12, 10], [4, 4, 10, 12]]
+
+        for method in ('two-pass covariance', 'naive', 'shifted covariance'):
+            cov = covar(h, method=method)
+
+            np.testing.assert_allclose(cov, np.cov(h, rowvar=False))
+            np.testing.assert_array_equal(cov, cov.T)
+
+    def test_chunked_covariance(self, tmp_path):
+        path = str(tmp_path / 'd.npy')
+        np.save(path, self.d[:, 1:])
+        expected = np.cov(self.d[:, 1:], rowvar=False)
+
+        for method in ('two-pass covariance', 'naive', 'shifted covariance'):
+            np.testing.assert_allclose(covar(path, method=method, chunksize=7), expected)
+            np.testing.assert_allclose(covar(np.load(path, mmap_mode='r'), method=method, chunksize=10), expected)
+            np.testing.assert_allclose(covar(iter(np.array_split(self.d[:, 1:], 5)), method=method), expected)
+            np.testing.assert_allclose(covar(self.d[:, 1:3], self.d[:, 3:], method, chunksize=9), expected)
+
+        with pytest.raises(ValueError):
+            covar(path, self.d[:, 1:])
+
+    def test_chunked_correlation(self, tmp_path):
+        path = str(tmp_path / 'd.npy')
+        np.save(path, self.d[:, 1:])
+
+        np.testing.assert_allclose(pearson(path, chunksize=7), np.corrcoef(self.d[:, 1:], rowvar=False))
+        np.testing.assert_allclose(spearman(path, chunksize=7), spearmanr(self.d[:, 1:])[0])
+        np.testing.assert_allclose(spearman(iter(np.array_split(self.d[:, 1:], 5))), spearmanr(self.d[:, 1:])[0])
+        np.testing.assert_allclose(spearman(self.d[:, 1:3], self.d[:, 3:], chunksize=7), spearmanr(self.d[:, 1:])[0])
+
+        empty = str(tmp_path / 'empty.npy')
+        np.save(empty, np.empty((0, 3)))
+
+        for x in (empty, np.load(empty, mmap_mode='r'), iter([])):
+            with pytest.raises(ValueError):
+                covar(x, method='naive')
+        for x in (empty, iter([])):
+            with pytest.raises(ValueError):
+                spearman(x)
+
+    def test_pairwise_complete(self):
+        d = self.d[:, 1:].copy()
+        d[[2, 9, 30], 0] = np.nan
+        d[[5, 9, 41], 2] = np.nan
+        dd = pd.DataFrame(d)
+
+        for method in ('two-pass covariance', 'naive', 'shifted covariance'):
+            np.testing.assert_allclose(covar(d, method=method, nan_policy='pairwise'), dd.cov().values)
+
+        np.testing.assert_allclose(pearson(d, nan_policy='pairwise'), dd.corr().values)
+
+        np.testing.assert_allclose(spearman(self.d[:, 1:], nan_policy='pairwise'), spearmanr(self.d[:, 1:])[0])
+        assert not np.any(np.isnan(spearman(d, nan_policy='pairwise')))
+
+        assert np.all(np.isnan(covar(d)[0, 1:]))
+
+        with pytest.raises(ValueError):
+            covar(d, nan_policy='NA')
+        with pytest.raises(ValueError):
+            pearson(d, chunksize=10, nan_policy='pairwise')
+
+    def test_tiled_correlation(self, tmp_path):
+        d = self.d[:, 1:]
+
+        np.testing.assert_allclose(tiled_correlation(d, block_size=3), pearson(d))
+        np.testing.assert_allclose(tiled_correlation(d, 'spearman', block_size=2, n_jobs=2), spearman(d))
+
+        out = tiled_correlation(d, block_size=3, out=str(tmp_path / 'r.npy'), n_jobs=-1)
+        assert isinstance(out, np.memmap)
+        np.testing.assert_allclose(np.load(str(tmp_path / 'r.npy')), pearson(d))
+
+        tiles = []
+        assert tiled_correlation(d, block_size=3, callback=lambda r, c, t: tiles.append((r, c, t))) is None
+        assert len(tiles) == 3
+        for rows, cols, tile in tiles:
+            np.testing.assert_allclose(tile, pearson(d)[rows, cols])
+
+        with pytest.raises(ValueError):
+            tiled_correlation(d, 'kendall')
+
+    def test_correlation_search(self):
+        d = self.d[:, 1:]
+        r = pearson(d)
+
+        hits = correlation_search(d, threshold=0.5, block_size=2)
+        expected = np.argwhere(np.abs(np.triu(r, 1)) >= 0.5)
+
+        np.testing.assert_array_equal([(i, j) for i, j, _ in hits], expected)
+        np.testing.assert_allclose([v for _, _, v in hits], r[expected[:, 0], expected[:, 1]])
+
+        top = correlation_search(d, 'spearman', top_k=2, block_size=3, n_jobs=2)
+        rs = np.abs(spearman(d))
+        np.fill_diagonal(rs, -1)
+
+        assert len(top) == 2 * d.shape[1]
+        for i in np.arange(d.shape[1]):
+            assert [j for ii, j, _ in top if ii == i] == list(np.argsort(-rs[i])[:2])
+
+        with pytest.raises(ValueError):
+            correlation_search(d)
+
     def test_covar_no_method(self):
         with pytest.raises(ValueError):
             covar(self.d[:, 1:3], self.d[:, 3:], 'NA_METHOD')
@@ -137,6 +241,17 @@ class TestVariance:
 
         np.testing.assert_equal(var(self.fa[:, 1], 'youngs cramer'), 2.25)
 
+    def test_var_axis_dtype(self):
+        for method in ('corrected two pass', 'textbook one pass', 'standard two pass', 'youngs cramer'):
+            np.testing.assert_allclose(var(self.fa.T, method, axis=1), var(self.fa, method))
+
+            v32 = var(self.fa.astype(np.float32), method)
+            assert v32.dtype == np.float32
+            np.testing.assert_allclose(v32, np.array([2, 2.25, 0.666667, 2]), rtol=1e-5)
+
+        np.testing.assert_allclose(std_dev(self.fa.T, axis=1), std_dev(self.fa))
+        np.testing.assert_allclose(variance_condition(self.fa.T, axis=1), variance_condition(self.fa))
+
     def test_stddev(self):
         np.testing.assert_equal(std_dev(self.fa[:, 1]), 1.5)
         np.testing.assert_allclose(std_dev(self.fa), array([ 1.41421356,  1.5       ,  0.81649658,  1.41421356]))
@@ -164,3 +279,106 @@ class TestVariance:
 
         with pytest.raises(ValueError):
             var(ff)
+
+
+class TestMomentAccumulator:
+
+    d = TestCorrelationCovariance.d[:, 1:]
+
+    def test_update_chunks(self):
+        acc = MomentAccumulator(comoments=True)
+
+        for chunk in np.array_split(self.d, 5):
+            acc.update(chunk)
+
+        assert acc.n == self.d.shape[0]
+        np.testing.assert_allclose(acc.mean, np.mean(self.d, axis=0))
+        np.testing.assert_allclose(acc.var(), var(self.d))
+        np.testing.assert_allclose(acc.std_dev(), std_dev(self.d))
+        np.testing.assert_allclose(acc.covar(), covar(self.d))
+
+    def test_merge(self):
+        a, b, c = MomentAccumulator(comoments=True), MomentAccumulator(comoments=True), \
+                  MomentAccumulator(comoments=True)
+
+        a.update(self.d[:10])
+        b.update(self.d[10:31])
+        c.update(self.d[31:])
+
+        merged = a.merge(b.merge(c))
+
+        np.testing.assert_allclose(merged.var(), var(self.d))
+        np.testing.assert_allclose(merged.covar(), covar(self.d))
+
+        empty = MomentAccumulator(comoments=True)
+        np.testing.assert_allclose(empty.merge(merged).var(), var(self.d))
+
+    def test_one_dimensional(self):
+        acc = MomentAccumulator()
+        acc.update(self.d[:20, 1])
+        acc.update(self.d[20:, 1])
+
+        np.testing.assert_almost_equal(acc.var(), var(self.d[:, 1]))
+
+        with pytest.raises(ValueError):
+            acc.covar()
+
+
+class TestMovingWindows:
+
+    d = TestCorrelationCovariance.d[:, 1:]
+
+    def test_rolling_moments(self):
+        r = RollingMoments(10, comoments=True)
+
+        assert np.isnan(r.mean)
+
+        for i, row in enumerate(self.d):
+            r.add(row)
+
+            if i >= 1:
+                window = self.d[max(0, i - 9):i + 1]
+
+                assert r.n == window.shape[0]
+                np.testing.assert_allclose(r.mean, np.mean(window, axis=0))
+                np.testing.assert_allclose(r.var(), var(window))
+                np.testing.assert_allclose(r.covar(), covar(window), atol=1e-12)
+
+        r1 = RollingMoments(5)
+        r1.update(self.d[:, 0])
+
+        np.testing.assert_almost_equal(r1.std_dev(), std_dev(self.d[-5:, 0]))
+
+        with pytest.raises(ValueError):
+            r1.covar()
+        with pytest.raises(ValueError):
+            RollingMoments(1)
+
+        r2, buffer = RollingMoments(3), np.empty(self.d.shape[1])
+
+        for row in self.d[:6]:
+            buffer[:] = row
+            r2.add(buffer)
+
+        np.testing.assert_allclose(r2.var(), var(self.d[3:6]))
+
+    def test_exponential_moments(self):
+        e = ExponentialMoments(0.2, comoments=True)
+        e.update(self.d)
+
+        expected = pd.DataFrame(self.d).ewm(alpha=0.2, adjust=False)
+
+        np.testing.assert_allclose(e.mean, expected.mean().iloc[-1].values)
+        np.testing.assert_allclose(e.var(), expected.var(bias=True).iloc[-1].values)
+        np.testing.assert_allclose(np.diag(e.covar()), e.var())
+
+        e1, buffer = ExponentialMoments(0.2), self.d[0].copy()
+        e1.add(buffer)
+        buffer[:] = 0.
+        e1.update(self.d[1:])
+
+        np.testing.assert_allclose(e1.mean, e.mean)
+        np.testing.assert_array_equal(buffer, 0.)
+
+        with pytest.raises(ValueError):
+            ExponentialMoments(1.5)